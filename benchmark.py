@@ -0,0 +1,292 @@
+import argparse
+import json
+import platform
+import resource
+import socket
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from constraints import ConstraintState
+from feedback import compute_feedback_codes, decode_feedback
+from simulation import SimulatedWordleSolver
+from word_engine import WordListEngine
+
+
+def summarize(samples: list[float]) -> dict:
+    """Latency summary of timing samples in seconds"""
+    if not samples:
+        return {"count": 0}
+    samples = np.asarray(samples)
+    return {
+        "count": len(samples),
+        "total": float(samples.sum()),
+        "mean": float(samples.mean()),
+        "p50": float(np.percentile(samples, 50)),
+        "p90": float(np.percentile(samples, 90)),
+        "p99": float(np.percentile(samples, 99)),
+        "max": float(samples.max()),
+    }
+
+
+def peak_memory_mb() -> float:
+    """Peak resident memory of this process so far"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+
+class StageTimingMixin:
+    """Records the time spent in each stage of the solver loop"""
+
+    def _init_stage_timings(self):
+        self.stage_timings = defaultdict(list)
+
+
+    def _next_guess(self):
+        start = time.perf_counter()
+        guess = super()._next_guess()
+        self.stage_timings["select_guess"].append(time.perf_counter() - start)
+        return guess
+
+
+    def _get_feedback(self, guess, verbose=False):
+        start = time.perf_counter()
+        feedback = super()._get_feedback(guess=guess, verbose=verbose)
+        self.stage_timings["feedback"].append(time.perf_counter() - start)
+        return feedback
+
+
+    def _apply_feedback(self, guess, feedback, verbose=False):
+        start = time.perf_counter()
+        solved = super()._apply_feedback(guess=guess, feedback=feedback, verbose=verbose)
+        self.stage_timings["update_word_list"].append(time.perf_counter() - start)
+        return solved
+
+
+class TimedSimulatedSolver(StageTimingMixin, SimulatedWordleSolver):
+    pass
+
+
+
+def run_games(timed_solver, play_game, num_games: int) -> dict:
+    """Plays num_games with a stage timed solver and reports the stage latencies and throughput"""
+
+    timed_solver._init_stage_timings()
+    game_times, n_solved = [], 0
+
+    start = time.perf_counter()
+    for game_index in range(num_games):
+        game_start = time.perf_counter()
+        guesses_used = play_game(game_index)
+        game_times.append(time.perf_counter() - game_start)
+        n_solved += guesses_used > 0
+    wall_time = time.perf_counter() - start
+    n_guesses = len(timed_solver.stage_timings["select_guess"])
+
+    return {
+        "games": num_games,
+        "success_rate": n_solved / num_games if num_games else 0.0,
+        "wall_time": wall_time,
+        "games_per_s": num_games / wall_time if wall_time else 0.0,
+        "guesses_per_s": n_guesses / wall_time if wall_time else 0.0,
+        "stages": {stage: summarize(samples) for stage, samples in timed_solver.stage_timings.items()} | {"game": summarize(game_times)},
+    }
+
+
+def bench_in_process(num_games: int, seed: int, **solver_kwargs) -> dict:
+    start = time.perf_counter()
+    timed_solver = TimedSimulatedSolver(seed=seed, **solver_kwargs)
+    load_time = time.perf_counter() - start
+
+    n_words = len(timed_solver.feedback_matrix.answer_words)
+    secrets = np.random.default_rng(seed).integers(low=0, high=n_words, size=num_games)
+    result = run_games(
+        timed_solver,
+        lambda game_index: timed_solver.play(int(secrets[game_index]), np.random.default_rng([seed, game_index])),
+        num_games,
+    )
+    result["stages"]["load"] = summarize([load_time])
+    return result
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def local_server(workers: int = 1):
+    """Runs wordle_api on a free local port with uvicorn, yielding its base url and the time it took to answer"""
+
+    import requests
+
+    port = _free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "wordle_api:app", "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=Path(__file__).parent,
+    )
+    try:
+        # Wait for the server to answer
+        while True:
+            try:
+                requests.get(f"http://127.0.0.1:{port}/", timeout=1)
+                break
+            except requests.ConnectionError:
+                if server.poll() is not None:
+                    raise RuntimeError("The wordle api server failed to start")
+                time.sleep(0.05)
+        yield f"http://127.0.0.1:{port}", time.perf_counter() - start
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def bench_server(num_games: int, seed: int, **solver_kwargs) -> dict:
+    """Starts a local uvicorn server running wordle_api and plays the http solver against its global game"""
+
+    # The http client is only loaded for the server benchmark
+    import solver_api
+
+    class TimedApiSolver(StageTimingMixin, solver_api.WordleSolver):
+        pass
+
+    with local_server() as (base_url, startup_time):
+        timed_solver = TimedApiSolver(wordle_game_api=f"{base_url}/wordle", seed=seed, **solver_kwargs)
+
+        def play_game(game_index):
+            timed_solver.reset()
+            return timed_solver.guesses_used if timed_solver.solve() else 0
+
+        result = run_games(timed_solver, play_game, num_games)
+        result["server_startup_time"] = startup_time
+        return result
+
+
+
+def random_words(size: int, word_length: int = 5, seed: int = 0) -> list[str]:
+    """Unique random words, standing in for word lists of a given size"""
+    random_gen = np.random.default_rng(seed)
+    words = set()
+    while len(words) < size:
+        letters = random_gen.integers(low=0, high=26, size=(size, word_length), dtype=np.uint8) + ord("a")
+        words.update(letters.tobytes().decode("ascii")[i:i + word_length] for i in range(0, size * word_length, word_length))
+    return sorted(words)[:size]
+
+
+def _time_repeated(func, repeat: int) -> list[float]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def microbenchmarks(sizes: list[int], n_guesses: int = 256, repeat: int = 20, seed: int = 0) -> dict:
+    """Feedback computation and candidate filtering on synthetic word lists of increasing size"""
+
+    results = {}
+    random_gen = np.random.default_rng(seed)
+    for size in sizes:
+        words = random_words(size, seed=seed)
+        engine = WordListEngine(words)
+        guess_letters = engine.letters[:n_guesses]
+        candidates = np.arange(size)
+
+        codes = compute_feedback_codes(guess_letters, engine.letters)
+        guess_idxs = random_gen.integers(low=0, high=len(guess_letters), size=repeat)
+        secret_idxs = random_gen.integers(low=0, high=size, size=repeat)
+        feedbacks = [decode_feedback(codes[g, s]) for g, s in zip(guess_idxs, secret_idxs)]
+
+        def merge_and_narrow():
+            for g, feedback in zip(guess_idxs, feedbacks):
+                constraints = ConstraintState()
+                constraints.narrow(engine, candidates, constraints.merge(words[g], feedback))
+
+        feedback_samples = _time_repeated(lambda: compute_feedback_codes(guess_letters, engine.letters), repeat)
+        results[str(size)] = {
+            "feedback_matrix_rows_per_s": len(guess_letters) / float(np.median(feedback_samples)),
+            "feedback_codes": summarize(feedback_samples),
+            "encode_words": summarize(_time_repeated(lambda: WordListEngine(words), repeat)),
+            "filter_feedback_matrix": summarize(_time_repeated(
+                lambda: [candidates[codes[g, candidates] == codes[g, s]] for g, s in zip(guess_idxs, secret_idxs)], repeat)),
+            "filter_constraints": summarize(_time_repeated(merge_and_narrow, repeat)),
+        }
+    return results
+
+
+def startup_time(**solver_kwargs) -> float:
+    """Time for a fresh interpreter to import the solver and load it, with warm caches"""
+    code = (
+        "import time; start = time.perf_counter(); from simulation import SimulatedWordleSolver; "
+        f"SimulatedWordleSolver(**{solver_kwargs!r}); print(time.perf_counter() - start)"
+    )
+    return float(subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                                cwd=Path(__file__).parent).stdout)
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=Path(__file__).parent).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the WordleSolver and the wordle game api")
+    parser.add_argument("--games", type=int, default=200, help="Games per solver benchmark")
+    parser.add_argument("--guess-strategy", default="entropy")
+    parser.add_argument("--seed-word-strategy", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--sizes", type=lambda s: [int(size) for size in s.split(",")], default=[1000, 2000, 4000, 8000],
+                        help="Comma separated word list sizes for the microbenchmarks")
+    parser.add_argument("--no-server", action="store_true", help="Skip the benchmark against a local server")
+    parser.add_argument("--output", type=Path, default=None, help="Result file, defaults to bench_results/<timestamp>.json")
+    args = parser.parse_args()
+
+    solver_kwargs = {"guess_strategy": args.guess_strategy, "seed_word_strategy": args.seed_word_strategy}
+    timestamp = datetime.now(timezone.utc)
+    results = {
+        "timestamp": timestamp.isoformat(),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": vars(args) | {"output": None},
+    }
+
+    print("Benchmarking solver in-process...")
+    results["in_process"] = bench_in_process(args.games, args.seed, **solver_kwargs)
+    results["startup_time"] = startup_time(**solver_kwargs)
+    if not args.no_server:
+        print("Benchmarking solver against a local server...")
+        results["server"] = bench_server(args.games, args.seed, **solver_kwargs)
+    print("Running microbenchmarks...")
+    results["microbenchmarks"] = microbenchmarks(args.sizes)
+    results["peak_memory_mb"] = peak_memory_mb()
+
+    output = args.output or Path("bench_results") / f"{timestamp.strftime('%Y%m%dT%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w") as file:
+        json.dump(results, file, indent=4)
+
+    for mode in ("in_process", "server"):
+        if mode in results:
+            print(f"{mode}: {results[mode]['games_per_s']:.1f} games/s, {results[mode]['guesses_per_s']:.1f} guesses/s")
+            for stage, summary in results[mode]["stages"].items():
+                print(f"   {stage:<18} p50 {summary['p50']*1e3:8.3f}ms   p99 {summary['p99']*1e3:8.3f}ms")
+    print(f"Startup time {results['startup_time']:.3f}s, peak memory {results['peak_memory_mb']:.1f}MB")
+    print(f"Saved results to '{output}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import numpy as np
+
+from word_engine import ALPHABET_SIZE, WordListEngine
+
+# Words per bitset block
+BLOCK_BITS = 64
+
+
+def pack_rows(mask: np.ndarray) -> np.ndarray:
+    """Packs boolean rows over the word index into bitsets of uint64 blocks, word i being bit i % 64 of block i // 64"""
+    n_blocks = -(-mask.shape[-1] // BLOCK_BITS)
+    packed = np.packbits(mask, axis=-1, bitorder="little")
+    padding = [(0, 0)] * (mask.ndim - 1) + [(0, n_blocks * 8 - packed.shape[-1])]
+    return np.ascontiguousarray(np.pad(packed, padding)).view("<u8")
+
+
+def unpack_row(bitset: np.ndarray, n_words: int) -> np.ndarray:
+    """Indices of the words set in a bitset"""
+    return np.flatnonzero(np.unpackbits(bitset.view(np.uint8), bitorder="little", count=n_words))
+
+
+def popcount(bitsets: np.ndarray) -> np.ndarray:
+    """Number of words set in each bitset row"""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(bitsets).sum(axis=-1, dtype=np.int64)
+    return np.unpackbits(bitsets.view(np.uint8), axis=-1).sum(axis=-1, dtype=np.int64)
+
+
+
+class WordBitsets:
+    """Bitsets over a word list, shared by every game on it: the words with each letter at each position
+    and the words holding each letter at least k times, so feedback narrows a candidate set with a few ANDs"""
+
+    def __init__(self, engine: WordListEngine) -> None:
+        self.n_words = len(engine)
+        self.word_length = engine.letters.shape[1]
+        letters, counts = engine.letters, engine.letter_counts
+
+        # (word_length, 26, blocks) and (26, word_length + 1, blocks)
+        alphabet = np.arange(ALPHABET_SIZE)
+        self.position_letter = pack_rows(letters.T[:, None, :] == alphabet[None, :, None])
+        at_least = np.arange(self.word_length + 1)
+        self.letter_count = pack_rows(counts.T[:, None, :] >= at_least[None, :, None])
+        self.full = self.letter_count[0, 0].copy()
+
+
+    @property
+    def n_blocks(self) -> int:
+        return len(self.full)
+
+
+    def feedback_masks(self, letters: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """Bitsets of the words consistent with each encoded guess (G, word_length) getting its feedback code -> (G, blocks)"""
+
+        n_guesses, word_length = letters.shape
+        rows = np.arange(n_guesses)
+        letters = letters.astype(np.intp)
+        # Base-3 digits of the codes, first letter most significant
+        results = (codes.astype(np.int64)[:, None] // 3 ** np.arange(word_length - 1, -1, -1)) % 3
+
+        # Green and yellow occurrences are a lower bound on a letter's count, a gray one makes it exact
+        confirmed = np.zeros((n_guesses, ALPHABET_SIZE), dtype=np.intp)
+        has_gray = np.zeros((n_guesses, ALPHABET_SIZE), dtype=bool)
+        for pos in range(word_length):
+            confirmed[rows, letters[:, pos]] += results[:, pos] > 0
+            has_gray[rows, letters[:, pos]] |= results[:, pos] == 0
+
+        masks = np.tile(self.full, (n_guesses, 1))
+        for pos in range(word_length):
+            code = letters[:, pos]
+            at_pos = self.position_letter[pos, code]
+            masks &= np.where((results[:, pos] == 2)[:, None], at_pos, ~at_pos)
+
+            count = confirmed[rows, code]
+            masks &= self.letter_count[code, count]
+            exceeds = self.letter_count[code, np.minimum(count + 1, word_length)]
+            masks &= np.where(has_gray[rows, code][:, None], ~exceeds, self.full)
+        return masks
+
+
+
+class SolverStates:
+    """The candidate sets of many games in one contiguous (games, blocks) array, a few hundred bytes per game"""
+
+    def __init__(self, bitsets: WordBitsets, n_games: int) -> None:
+        self.bitsets = bitsets
+        self.states = np.tile(bitsets.full, (n_games, 1))
+
+
+    def __len__(self) -> int:
+        return len(self.states)
+
+
+    def reset(self, games: np.ndarray | None = None) -> None:
+        """Starts new games, all of them if games is None"""
+        self.states[slice(None) if games is None else games] = self.bitsets.full
+
+
+    def apply(self, games: np.ndarray, guesses: list[str], codes: np.ndarray) -> None:
+        """Narrows the candidates of each game by the feedback code of its guess, all games at once"""
+        self.states[games] &= self.bitsets.feedback_masks(WordListEngine.encode_words(guesses), codes)
+
+
+    def counts(self, games: np.ndarray | None = None) -> np.ndarray:
+        return popcount(self.states if games is None else self.states[games])
+
+
+    def candidates(self, game: int) -> np.ndarray:
+        """Word indices of the candidates of a game"""
+        return unpack_row(self.states[game], self.bitsets.n_words)
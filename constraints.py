@@ -0,0 +1,117 @@
+import numpy as np
+
+from metrics import metrics
+from word_engine import ALPHABET_SIZE, WordListEngine
+
+ALL_LETTERS = (1 << ALPHABET_SIZE) - 1
+
+
+class ConstraintState:
+    """Knowledge gained from guessing: a bitmask of the allowed letters per position plus min/max counts per letter.
+    The state has a fixed size, so snapshots and restores are O(1) no matter how many guesses were merged."""
+
+    __slots__ = ("allowed", "min_counts", "max_counts", "greens")
+
+    def __init__(self, word_length: int = 5) -> None:
+        self.allowed = np.full(word_length, ALL_LETTERS, dtype=np.uint32)
+        self.min_counts = np.zeros(ALPHABET_SIZE, dtype=np.uint8)
+        self.max_counts = np.full(ALPHABET_SIZE, word_length, dtype=np.uint8)
+        # Letter codes revealed green per position (-1 if none), the hints hard mode forces to be reused
+        self.greens = np.full(word_length, -1, dtype=np.int8)
+
+
+    def snapshot(self) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        return self.allowed.copy(), self.min_counts.copy(), self.max_counts.copy(), self.greens.copy()
+
+
+    def restore(self, snapshot: tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]) -> None:
+        self.allowed[:], self.min_counts[:], self.max_counts[:], self.greens[:] = snapshot
+
+
+    @metrics.timed("constraint_update")
+    def merge(self, word: str, feedback: str) -> list[int]:
+        """Merges the feedback for a guessed word, returns the letter codes it gave new information about"""
+        # feedback -> '00120' -> gray, gray, yellow, green, gray
+
+        if len(word) != len(self.allowed) or len(feedback) != len(word):
+            raise ValueError(f"The word and feedback must be {len(self.allowed)} long")
+
+        codes = WordListEngine.encode_words([word])[0]
+        confirmed = np.zeros(ALPHABET_SIZE, dtype=np.uint8)
+        has_gray = np.zeros(ALPHABET_SIZE, dtype=bool)
+
+        for pos, (code, result) in enumerate(zip(codes, feedback)):
+            bit = np.uint32(1 << int(code))
+            match result:
+                case "2":
+                    self.allowed[pos] = bit
+                    self.greens[pos] = code
+                    confirmed[code] += 1
+                case "1":
+                    self.allowed[pos] &= ~bit
+                    confirmed[code] += 1
+                case "0":
+                    self.allowed[pos] &= ~bit
+                    has_gray[code] = True
+                case _:
+                    raise ValueError(f"The feedback had an unknown charactor: {result}")
+
+        # Green and yellow occurrences are a lower bound on the count, a gray one makes it exact
+        self.min_counts = np.maximum(self.min_counts, confirmed)
+        self.max_counts[has_gray] = np.minimum(self.max_counts[has_gray], confirmed[has_gray])
+
+        # A letter that cannot appear is not allowed anywhere
+        excluded = np.flatnonzero(self.max_counts == 0)
+        if len(excluded):
+            self.allowed &= ~np.uint32(np.bitwise_or.reduce(np.left_shift(1, excluded)))
+
+        return np.unique(codes).tolist()
+
+
+    def mask(self, letters: np.ndarray, letter_counts: np.ndarray, letter_codes: list[int] | None = None) -> np.ndarray:
+        """Boolean mask of the encoded words satisfying the constraints.
+        The counts are only checked for letter_codes if given, e.g. the letters touched by the last merge."""
+
+        mask = np.ones(letters.shape[0], dtype=bool)
+        for pos in range(letters.shape[1]):
+            mask &= ((self.allowed[pos] >> letters[:, pos]) & 1).astype(bool)
+
+        letter_codes = slice(None) if letter_codes is None else letter_codes
+        counts = letter_counts[:, letter_codes]
+        mask &= ((counts >= self.min_counts[letter_codes]) & (counts <= self.max_counts[letter_codes])).all(axis=1)
+        return mask
+
+
+    @metrics.timed("filter_constraints")
+    def narrow(self, engine: WordListEngine, candidates: np.ndarray, letter_codes: list[int] | None = None) -> np.ndarray:
+        """Returns the candidate indices still satisfying the constraints, only looking at the candidates"""
+        mask = self.mask(engine.letters[candidates], engine.letter_counts[candidates], letter_codes)
+        return candidates[mask]
+
+
+    def hard_mode_mask(self, letters: np.ndarray, letter_counts: np.ndarray) -> np.ndarray:
+        """Boolean mask of the encoded words allowed as a hard mode guess: every green stays in place and
+        every revealed letter is reused. Unlike mask, grays and yellow positions may be played again."""
+
+        mask = np.ones(letters.shape[0], dtype=bool)
+        for pos in np.flatnonzero(self.greens >= 0):
+            mask &= letters[:, pos] == self.greens[pos]
+
+        required = np.flatnonzero(self.min_counts)
+        mask &= (letter_counts[:, required] >= self.min_counts[required]).all(axis=1)
+        return mask
+
+
+    def hard_mode_violation(self, word: str) -> str | None:
+        """Why the word is not allowed as a hard mode guess, or None if it is"""
+
+        codes = WordListEngine.encode_words([word])[0]
+        for pos in np.flatnonzero(self.greens >= 0):
+            if codes[pos] != self.greens[pos]:
+                return f"Letter {pos + 1} must be '{chr(ord('a') + int(self.greens[pos]))}'"
+
+        counts = np.bincount(codes, minlength=ALPHABET_SIZE)
+        for code in np.flatnonzero(counts < self.min_counts):
+            times = "" if self.min_counts[code] == 1 else f" {self.min_counts[code]} times"
+            return f"Guess must contain '{chr(ord('a') + int(code))}'{times}"
+        return None
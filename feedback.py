@@ -0,0 +1,276 @@
+import hashlib
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from metrics import metrics
+from word_engine import WordListEngine
+from word_list import DATA_DIR
+
+# Bump when the feedback rules change, so cached matrices are rebuilt
+SCORER_VERSION = 2
+
+# Rows of the guess x answer matrix computed per chunk
+CHUNK_SIZE = 512
+
+# Repeated letter cases (guess, secret, feedback) the scorers are checked against, see check_scorers
+REGRESSION_CASES = [
+    ("eerie", "crane", "00102"),  # Only the green copy counts when the secret has the letter once
+    ("crane", "eerie", "01002"),
+    ("speed", "abide", "00101"),  # One yellow for a letter the secret has once
+    ("speed", "erase", "10110"),  # Two yellows for a letter the secret has twice
+    ("abbey", "kebab", "11210"),  # Green and yellow copies of the same letter
+    ("kebab", "abbey", "01211"),
+    ("allee", "eagle", "11012"),  # A later green claims its copy before an earlier yellow
+    ("llama", "hello", "11000"),
+    ("hello", "llama", "00110"),
+    ("geese", "those", "00022"),  # Every copy is claimed by the green
+    ("robot", "floor", "11020"),
+    ("sissy", "stars", "20100"),  # Three guessed copies, two in the secret
+    ("error", "order", "12012"),
+    ("mamma", "maxim", "22100"),
+    ("tales", "tales", "22222"),
+]
+
+# Longest supported words, whose 3**word_length feedback codes still fit a uint16
+MAX_WORD_LENGTH = 10
+
+
+def feedback_dtype(word_length: int = 5) -> np.dtype:
+    """Smallest unsigned dtype holding every feedback code of the word length plus an invalid marker"""
+    if not 0 < word_length <= MAX_WORD_LENGTH:
+        raise ValueError(f"Word lengths from 1 to {MAX_WORD_LENGTH} are supported")
+    return np.dtype(np.uint8) if 3 ** word_length <= 255 else np.dtype(np.uint16)
+
+
+def invalid_code(word_length: int = 5) -> int:
+    """Marks a failed entry in batches of feedback codes, never a valid code for the word length"""
+    return int(np.iinfo(feedback_dtype(word_length)).max)
+
+
+
+def encode_feedback(feedback: str) -> int:
+    """Encodes a feedback string ('00120') as a base-3 code, first letter most significant -> 0-242 for 5 letters"""
+    code = 0
+    for result in feedback:
+        if result not in "012":
+            raise ValueError(f"The feedback had an unknown charactor: {result}")
+        code = code * 3 + int(result)
+    return code
+
+
+def decode_feedback(code: int, word_length: int = 5) -> str:
+    """Decodes a base-3 feedback code back into a feedback string"""
+    feedback = []
+    for _ in range(word_length):
+        code, result = divmod(int(code), 3)
+        feedback.append(str(result))
+    return "".join(reversed(feedback))
+
+
+def solved_code(word_length: int = 5) -> int:
+    """The feedback code of an all green guess"""
+    return 3 ** word_length - 1
+
+
+def score_guess(guess: str, secret_word: str) -> str:
+    """Feedback for a guess against the secret word, e.g. '00120' for gray, gray, yellow, green, gray.
+    Greens are matched first, then yellows left to right while the secret has unmatched copies of the letter."""
+
+    if len(guess) != len(secret_word):
+        raise ValueError("The guess and the secret word must have the same length")
+
+    feedback = ["0"] * len(guess)
+    unmatched = {}
+    for pos, (guess_letter, secret_letter) in enumerate(zip(guess, secret_word)):
+        if guess_letter == secret_letter:
+            feedback[pos] = "2"
+        else:
+            unmatched[secret_letter] = unmatched.get(secret_letter, 0) + 1
+
+    for pos, guess_letter in enumerate(guess):
+        if feedback[pos] != "2" and unmatched.get(guess_letter, 0) > 0:
+            feedback[pos] = "1"
+            unmatched[guess_letter] -= 1
+
+    return "".join(feedback)
+
+
+def check_scorers() -> list[tuple[str, str, str, str, str]]:
+    """Scores the regression cases with the scalar and the vectorized scorers, returning the mismatching cases
+    as (guess, secret, expected, scalar, vectorized)"""
+
+    guesses, secrets, expected = zip(*REGRESSION_CASES)
+    codes = compute_pair_feedback_codes(WordListEngine.encode_words(list(guesses)), WordListEngine.encode_words(list(secrets)))
+    matrix = compute_feedback_codes(WordListEngine.encode_words(list(guesses)), WordListEngine.encode_words(list(secrets)))
+
+    failures = []
+    for i, (guess, secret, feedback) in enumerate(REGRESSION_CASES):
+        scalar, vectorized = score_guess(guess, secret), decode_feedback(codes[i], len(guess))
+        if scalar != feedback or vectorized != feedback or decode_feedback(matrix[i, i], len(guess)) != feedback:
+            failures.append((guess, secret, feedback, scalar, vectorized))
+    return failures
+
+
+def _two_pass_codes(guess_letters: np.ndarray, green: list[np.ndarray], answer_count, expand) -> np.ndarray:
+    """Feedback codes from the per position green masks, vectorized version of score_guess.
+    answer_count(pos) gives the count of the guessed letter in the answers, expand shapes a per guess mask like green."""
+
+    codes = np.zeros(green[0].shape, dtype=feedback_dtype(guess_letters.shape[1]))
+    n_positions = guess_letters.shape[1]
+    for pos in range(n_positions):
+        # Copies of the letter claimed by its greens anywhere, and by yellows at earlier positions
+        claimed = np.zeros(green[0].shape, dtype=np.uint8)
+        for other in range(n_positions):
+            same = guess_letters[:, other] == guess_letters[:, pos]
+            if other != pos and not same.any():
+                continue
+            same = expand(same)
+            claimed += same & green[other]
+            if other < pos:
+                claimed += same & ~green[other]
+        yellow = ~green[pos] & (claimed < answer_count(pos))
+        codes *= 3
+        codes += 2 * green[pos].astype(codes.dtype) + yellow.astype(codes.dtype)
+
+    return codes
+
+
+def compute_feedback_codes(guess_letters: np.ndarray, answer_letters: np.ndarray) -> np.ndarray:
+    """Computes the (G, A) matrix of feedback codes for encoded guesses against encoded answers, scored like score_guess"""
+
+    # (26, A) lookup, so the count of a guess letter in every answer is a single row gather
+    counts_by_letter = WordListEngine._count_letters(answer_letters).T
+
+    green = [guess_letters[:, pos, None] == answer_letters[None, :, pos] for pos in range(guess_letters.shape[1])]
+    return _two_pass_codes(
+        guess_letters,
+        green,
+        answer_count=lambda pos: counts_by_letter[guess_letters[:, pos]],
+        expand=lambda mask: mask[:, None],
+    )
+
+
+def compute_pair_feedback_codes(guess_letters: np.ndarray, answer_letters: np.ndarray) -> np.ndarray:
+    """Computes the feedback code of each encoded guess against the encoded answer in the same row -> (N,)"""
+
+    rows = np.arange(answer_letters.shape[0])
+    answer_counts = WordListEngine._count_letters(answer_letters)
+
+    green = [guess_letters[:, pos] == answer_letters[:, pos] for pos in range(guess_letters.shape[1])]
+    return _two_pass_codes(
+        guess_letters,
+        green,
+        answer_count=lambda pos: answer_counts[rows, guess_letters[:, pos]],
+        expand=lambda mask: mask,
+    )
+
+
+def _build_chunk(path: str, start: int, guess_letters: np.ndarray, answer_letters: np.ndarray) -> None:
+    """Worker: computes a block of rows and writes it straight into the shared .npy file"""
+    matrix = np.load(path, mmap_mode="r+")
+    matrix[start:start + guess_letters.shape[0]] = compute_feedback_codes(guess_letters, answer_letters)
+    matrix.flush()
+
+
+def word_list_hash(guess_words: list[str], answer_words: list[str]) -> str:
+    """Hash identifying a guess/answer word list pair and the feedback rules"""
+    digest = hashlib.sha256(f"v{SCORER_VERSION}".encode())
+    digest.update("\n".join(guess_words).encode())
+    digest.update(b"|")
+    digest.update("\n".join(answer_words).encode())
+    return digest.hexdigest()[:16]
+
+
+class FeedbackMatrix:
+    def __init__(self, matrix: np.ndarray, guess_words: list[str], answer_words: list[str], path: Path | None = None) -> None:
+        self.matrix = matrix
+        self.path = path
+        self.guess_words = guess_words
+        self.answer_words = answer_words
+        self.guess_index = {word: i for i, word in enumerate(guess_words)}
+        self.answer_index = {word: i for i, word in enumerate(answer_words)}
+        self.answer_guess_idx = np.array([self.guess_index.get(word, -1) for word in answer_words], dtype=np.int64)
+        self.word_length = len(guess_words[0]) if guess_words else 5
+
+
+    @classmethod
+    def load_or_build(cls,
+                      guess_words: list[str],
+                      answer_words: list[str] | None = None,
+                      cache_dir: Path = DATA_DIR,
+                      workers: int | None = None,
+                      verbose: bool = False,
+                      ) -> "FeedbackMatrix":
+        """Loads the cached matrix for the word lists as a read-only memmap, building it first if it is missing"""
+
+        if answer_words is None:
+            answer_words = guess_words
+
+        path = Path(cache_dir) / f"feedback_{word_list_hash(guess_words, answer_words)}.npy"
+        if not path.exists():
+            if verbose: print(f"Building {len(guess_words)}x{len(answer_words)} feedback matrix at '{path}'...")
+            cls.build(
+                guess_letters=WordListEngine.encode_words(guess_words),
+                answer_letters=WordListEngine.encode_words(answer_words),
+                path=path,
+                workers=workers,
+            )
+
+        return cls(np.load(path, mmap_mode="r"), guess_words, answer_words, path=path)
+
+
+    @staticmethod
+    def build(guess_letters: np.ndarray, answer_letters: np.ndarray, path: Path, workers: int | None = None) -> None:
+        """Computes the full feedback matrix in row chunks across processes and saves it as a .npy file"""
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.stem}.{os.getpid()}.tmp.npy")
+
+        # Preallocate the file, so every worker can write its rows in place
+        shape = (guess_letters.shape[0], answer_letters.shape[0])
+        dtype = feedback_dtype(guess_letters.shape[1])
+        np.lib.format.open_memmap(tmp_path, mode="w+", dtype=dtype, shape=shape).flush()
+
+        starts = range(0, shape[0], CHUNK_SIZE)
+        workers = workers or os.cpu_count() or 1
+        try:
+            if workers == 1 or len(starts) == 1:
+                for start in starts:
+                    _build_chunk(str(tmp_path), start, guess_letters[start:start + CHUNK_SIZE], answer_letters)
+            else:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    futures = [
+                        executor.submit(_build_chunk, str(tmp_path), start, guess_letters[start:start + CHUNK_SIZE], answer_letters)
+                        for start in starts
+                    ]
+                    for future in futures:
+                        future.result()
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+
+    def feedback(self, guess: str, answer: str) -> str:
+        """O(1) feedback lookup for a guess/answer word pair"""
+        code = self.matrix[self.guess_index[guess], self.answer_index[answer]]
+        return decode_feedback(code, self.word_length)
+
+
+    @metrics.timed("filter_feedback_matrix")
+    def filter(self, guess_idx: int, candidates: np.ndarray, code: int) -> np.ndarray:
+        """Returns the candidate answer indices that would have produced the observed feedback code"""
+        return candidates[self.matrix[guess_idx, candidates] == code]
+
+
+
+if __name__ == "__main__":
+    failures = check_scorers()
+    for guess, secret, expected, scalar, vectorized in failures:
+        print(f"'{guess}' against '{secret}': expected {expected}, scored {scalar} (scalar) and {vectorized} (vectorized)")
+    print(f"{len(REGRESSION_CASES) - len(failures)}/{len(REGRESSION_CASES)} feedback regression cases passed")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,323 @@
+import argparse
+import atexit
+import csv
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Iterator
+
+import numpy as np
+
+from feedback import compute_pair_feedback_codes, decode_feedback, feedback_dtype, invalid_code, solved_code
+from word_engine import WordListEngine
+
+# First line of every game log file, followed by a json header line and the fixed size game records
+MAGIC = b"WORDLELOG1\n"
+
+# Games decoded at once when reading a log
+READ_CHUNK_SIZE = 1 << 16
+
+
+def record_dtype(word_length: int = 5, max_guesses: int = 6) -> np.dtype:
+    """One finished game: its start time and duration (seconds), the secret (answer list index) and per guess the
+    guess word list index (-1 if not in the list) and feedback code (invalid_code past the last guess)"""
+    return np.dtype([
+        ("started", "<f8"),
+        ("duration", "<f4"),
+        ("secret_idx", "<u4"),
+        ("n_guesses", "u1"),
+        ("guess_idx", "<i4", (max_guesses,)),
+        ("codes", feedback_dtype(word_length).newbyteorder("<"), (max_guesses,)),
+    ])
+
+
+
+class GameLogWriter:
+    """Appends finished games to a binary log file of this process in log_dir, e.g. games_5_<time>_<pid>.bin.
+    Logging only queues the game, a background thread scores and writes the queued games in batches,
+    every flush_interval seconds or once batch_size games are waiting."""
+
+    def __init__(self,
+                 log_dir: str | Path,
+                 guess_words: list[str],
+                 answer_words: list[str],
+                 max_guesses: int = 6,
+                 batch_size: int = 4096,
+                 flush_interval: float = 1.0,
+                 ) -> None:
+        self.log_dir = Path(log_dir)
+        self.guess_words = guess_words
+        self.answer_words = answer_words
+        self.guess_index = {word: i for i, word in enumerate(guess_words)}
+        self.word_length = len(answer_words[0])
+        self.max_guesses = max_guesses
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dtype = record_dtype(self.word_length, max_guesses)
+
+        self._pending = []
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread = None
+        self._file = None
+        self._pid = None
+        self.path = None
+        atexit.register(self.close)
+
+
+    def log(self, secret_idx: int, guesses: list[str], started: float, ended: float | None = None) -> None:
+        """Queues a finished game, cheap enough to call while handling a request"""
+        if not guesses:
+            return
+        ended = time.time() if ended is None else ended
+        with self._lock:
+            self._pending.append((int(secret_idx), list(guesses[:self.max_guesses]), started, ended))
+            n_pending = len(self._pending)
+            if self._thread is None or self._pid != os.getpid():
+                self._start()
+        if n_pending >= self.batch_size:
+            self._wake.set()
+
+
+    def _start(self) -> None:
+        # Threads do not survive a fork, so every process starts its own writer and file
+        self._pid = os.getpid()
+        self._file = None
+        self._thread = threading.Thread(target=self._run, name="game-log-writer", daemon=True)
+        self._thread.start()
+
+
+    def _run(self) -> None:
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+
+    def _records(self, games: list[tuple]) -> np.ndarray:
+        """Scores the guesses of the games in one vectorized pass and packs them into records"""
+        records = np.zeros(len(games), dtype=self.dtype)
+        records["guess_idx"] = -1
+        records["codes"] = invalid_code(self.word_length)
+
+        records["secret_idx"] = [game[0] for game in games]
+        records["n_guesses"] = [len(game[1]) for game in games]
+        records["started"] = [game[2] for game in games]
+        records["duration"] = [game[3] - game[2] for game in games]
+
+        rows, turns, guess_idx = [], [], []
+        scored_rows, scored_turns, guesses, secrets = [], [], [], []
+        for row, (secret_idx, game_guesses, _, _) in enumerate(games):
+            for turn, guess in enumerate(game_guesses):
+                rows.append(row)
+                turns.append(turn)
+                guess_idx.append(self.guess_index.get(guess, -1))
+                # Guesses of other lengths or with other characters have no feedback
+                if len(guess) == self.word_length and guess.isascii() and guess.isalpha() and guess.islower():
+                    scored_rows.append(row)
+                    scored_turns.append(turn)
+                    guesses.append(guess)
+                    secrets.append(self.answer_words[secret_idx])
+
+        records["guess_idx"][rows, turns] = guess_idx
+        if guesses:
+            records["codes"][scored_rows, scored_turns] = compute_pair_feedback_codes(
+                WordListEngine.encode_words(guesses), WordListEngine.encode_words(secrets)
+            )
+        return records
+
+
+    def _open(self):
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        timestamp = time.strftime("%Y%m%dT%H%M%S")
+        self.path = self.log_dir / f"games_{self.word_length}_{timestamp}_{os.getpid()}.bin"
+        header = {
+            "word_length": self.word_length,
+            "max_guesses": self.max_guesses,
+            "dtype": np.lib.format.dtype_to_descr(self.dtype),
+            "answer_words": self.answer_words,
+            "guess_words": self.guess_words,
+        }
+        file = open(self.path, "ab")
+        file.write(MAGIC + json.dumps(header).encode() + b"\n")
+        return file
+
+
+    def flush(self) -> None:
+        """Writes the queued games"""
+        with self._lock:
+            games, self._pending = self._pending, []
+        if not games:
+            return
+        records = self._records(games)
+        with self._write_lock:
+            if self._file is None:
+                self._file = self._open()
+            self._file.write(records.tobytes())
+            self._file.flush()
+
+
+    def close(self) -> None:
+        """Stops the writer thread after writing the queued games"""
+        self._closed = True
+        self._wake.set()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join()
+        self.flush()
+        with self._write_lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+
+def read_header(file) -> dict:
+    if file.readline() != MAGIC:
+        raise ValueError(f"'{file.name}' is not a game log")
+    header = json.loads(file.readline())
+    header["dtype"] = np.lib.format.descr_to_dtype([tuple(field) for field in header["dtype"]])
+    return header
+
+
+def log_files(paths: list[str | Path]) -> list[Path]:
+    """The game log files given directly or found in the given directories"""
+    files = []
+    for path in map(Path, paths):
+        files.extend(sorted(path.glob("games_*.bin")) if path.is_dir() else [path])
+    return files
+
+
+def read_game_log(paths: list[str | Path], chunk_size: int = READ_CHUNK_SIZE) -> Iterator[tuple[dict, np.ndarray]]:
+    """Streams the game records of the log files in chunks of at most chunk_size, with the header of their file.
+    A partly written last record (e.g. after a crash) is skipped."""
+    for path in log_files(paths):
+        with open(path, "rb") as file:
+            header = read_header(file)
+            itemsize = header["dtype"].itemsize
+            while True:
+                data = file.read(chunk_size * itemsize)
+                n_records = len(data) // itemsize
+                if n_records == 0:
+                    break
+                yield header, np.frombuffer(data[:n_records * itemsize], dtype=header["dtype"])
+
+
+
+class GameLogStats:
+    """Aggregates game records chunk by chunk, keeping only per secret word counters in memory"""
+
+    def __init__(self) -> None:
+        self.games = 0
+        self.solved = 0
+        self.total_duration = 0.0
+        self.guess_histogram = np.zeros(0, dtype=np.int64)
+        # Per secret word (of the first log's answer list): games, games solved and guesses used in solved games
+        self.answer_words = None
+        self.plays = np.zeros(0, dtype=np.int64)
+        self.wins = np.zeros(0, dtype=np.int64)
+        self.win_guesses = np.zeros(0, dtype=np.int64)
+
+
+    @staticmethod
+    def _add(counts: np.ndarray, more: np.ndarray) -> np.ndarray:
+        if len(more) > len(counts):
+            counts = np.pad(counts, (0, len(more) - len(counts)))
+        counts[:len(more)] += more
+        return counts
+
+
+    def update(self, header: dict, records: np.ndarray) -> None:
+        if self.answer_words is None:
+            self.answer_words = header["answer_words"]
+        elif header["answer_words"] != self.answer_words:
+            raise ValueError("Game logs of different answer lists cannot be aggregated together")
+
+        # A game is solved if its last guess was all green
+        n_guesses = records["n_guesses"].astype(np.int64)
+        last_codes = records["codes"][np.arange(len(records)), np.maximum(n_guesses - 1, 0)]
+        solved = last_codes == solved_code(header["word_length"])
+
+        self.games += len(records)
+        self.solved += int(solved.sum())
+        self.total_duration += float(records["duration"].sum())
+        self.guess_histogram = self._add(self.guess_histogram, np.bincount(n_guesses[solved]))
+
+        n_answers = len(self.answer_words)
+        secrets = records["secret_idx"].astype(np.int64)
+        self.plays = self._add(self.plays, np.bincount(secrets, minlength=n_answers))
+        self.wins = self._add(self.wins, np.bincount(secrets[solved], minlength=n_answers))
+        self.win_guesses = self._add(self.win_guesses, np.bincount(secrets[solved], weights=n_guesses[solved], minlength=n_answers).astype(np.int64))
+
+
+    def hardest_words(self, top: int = 10, min_plays: int = 1) -> list[dict]:
+        """The secret words with the lowest win rate, then the most guesses per win"""
+        played = np.flatnonzero(self.plays >= min_plays)
+        win_rate = self.wins[played] / self.plays[played]
+        avg_guesses = np.divide(self.win_guesses[played], self.wins[played], out=np.full(len(played), np.inf), where=self.wins[played] > 0)
+        order = played[np.lexsort((-avg_guesses, win_rate))][:top]
+        return [{
+            "word": self.answer_words[idx],
+            "plays": int(self.plays[idx]),
+            "win_rate": float(self.wins[idx] / self.plays[idx]),
+            "avg_guesses": float(self.win_guesses[idx] / self.wins[idx]) if self.wins[idx] else None,
+        } for idx in order]
+
+
+    def report(self, top: int = 10, min_plays: int = 1) -> dict:
+        return {
+            "games": self.games,
+            "win_rate": self.solved / self.games if self.games else 0.0,
+            "avg_guesses": float((np.arange(len(self.guess_histogram)) * self.guess_histogram).sum() / self.solved) if self.solved else 0.0,
+            "avg_duration": self.total_duration / self.games if self.games else 0.0,
+            "guess_histogram": {int(n): int(count) for n, count in enumerate(self.guess_histogram) if count},
+            "hardest_words": self.hardest_words(top, min_plays) if self.games else [],
+        }
+
+
+def export_csv(paths: list[str | Path], output: str | Path) -> int:
+    """Streams the games of the logs into a csv file with one row per game, returns the number of games"""
+    n_games = 0
+    with open(output, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["started", "duration", "secret_word", "guesses", "feedback"])
+        for header, records in read_game_log(paths):
+            guess_words, answer_words, word_length = header["guess_words"], header["answer_words"], header["word_length"]
+            invalid = invalid_code(word_length)
+            for record in records:
+                turns = range(record["n_guesses"])
+                writer.writerow([
+                    f"{record['started']:.3f}",
+                    f"{record['duration']:.3f}",
+                    answer_words[record["secret_idx"]],
+                    " ".join(guess_words[record["guess_idx"][turn]] if record["guess_idx"][turn] >= 0 else "?" for turn in turns),
+                    " ".join(decode_feedback(record["codes"][turn], word_length) if record["codes"][turn] != invalid else "?" for turn in turns),
+                ])
+            n_games += len(records)
+    return n_games
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aggregate stats over logged games, streaming through the log files")
+    parser.add_argument("paths", nargs="+", help="Game log files or directories holding them")
+    parser.add_argument("--top", type=int, default=10, help="Hardest words to show")
+    parser.add_argument("--min-plays", type=int, default=5, help="Games a word needs to count among the hardest")
+    parser.add_argument("--csv", type=Path, default=None, help="Also export every game as a csv row")
+    args = parser.parse_args()
+
+    stats = GameLogStats()
+    for header, records in read_game_log(args.paths):
+        stats.update(header, records)
+    print(json.dumps(stats.report(args.top, args.min_plays), indent=4))
+
+    if args.csv is not None:
+        n_games = export_csv(args.paths, args.csv)
+        print(f"Exported {n_games} games to '{args.csv}'")
+
+
+if __name__ == "__main__":
+    main()
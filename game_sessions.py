@@ -0,0 +1,237 @@
+import secrets
+import time
+
+import numpy as np
+
+from constraints import ConstraintState
+from feedback import compute_pair_feedback_codes, encode_feedback, feedback_dtype, invalid_code, solved_code
+from game_log import GameLogWriter
+from game_state import GameSession, MemoryBackend, SQLiteBackend
+from word_engine import WordListEngine
+from wordle_game import WordleGame
+
+
+def session_word_length(session_id: str) -> int | None:
+    """The word length encoded in a session id, e.g. 5 for '5.<token>'"""
+    prefix, separator, _ = session_id.partition(".")
+    return int(prefix) if separator and prefix.isdigit() else None
+
+
+
+class SessionStore:
+    """Session scoped games, held by a state backend: in this process' memory by default (evicting sessions idle for
+    longer than ttl and the least recently used ones above max_sessions), or e.g. a SQLiteBackend shared by several workers"""
+
+    def __init__(self,
+                 word_list: list[str],
+                 ttl: float = 3600.0,
+                 max_sessions: int = 500_000,
+                 max_guesses: int = 6,
+                 seed: int | None = None,
+                 backend: MemoryBackend | SQLiteBackend | None = None,
+                 game_log: GameLogWriter | None = None,
+                 allowed_guesses: set[str] | None = None,
+                 hard_mode: bool = False,
+                 ) -> None:
+        self.word_list = word_list
+        self.max_guesses = max_guesses
+        self.random_gen = np.random.default_rng(seed=seed)
+        self.backend = backend if backend is not None else MemoryBackend(ttl=ttl, max_sessions=max_sessions)
+        self.game_log = game_log
+        
+        # The same rules as WordleGame: guesses from the allowed list only (if given), and hard mode
+        self.allowed_guesses = allowed_guesses
+        self.hard_mode = hard_mode
+
+
+    def __len__(self) -> int:
+        return len(self.backend)
+
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self.backend
+
+
+    def _random_secret_idx(self) -> int:
+        return int(self.random_gen.integers(low=0, high=len(self.word_list)))
+
+
+    def create(self) -> str:
+        """Starts a new game and returns its session id, prefixed with the word length so every worker finds its store"""
+        session_id = f"{len(self.word_list[0])}.{secrets.token_urlsafe(12)}"
+        self.backend.put(session_id, GameSession(self._random_secret_idx()))
+        return session_id
+
+
+    def create_many(self, count: int) -> list[str]:
+        with self.backend.transaction():
+            return [self.create() for _ in range(count)]
+
+
+    def get(self, session_id: str) -> GameSession:
+        """Looks up a live session, raising KeyError if it does not exist or has expired"""
+        return self.backend.get(session_id)
+
+
+    def delete(self, session_id: str) -> None:
+        self.backend.delete(session_id)
+
+
+    def _restart(self, session: GameSession, finished: bool = False) -> dict:
+        response = {
+            "message": "Game restarted.",
+            "secret_word": self.word_list[session.secret_idx],
+            "guesses": session.guesses,
+        }
+        self._new_game(session, finished)
+        return response
+
+
+    def _new_game(self, session: GameSession, finished: bool = False) -> None:
+        """Starts the next game of the session, recording the current one in the game log if it finished
+        (solved or out of guesses), abandoned games are not recorded"""
+        if finished and self.game_log is not None:
+            self.game_log.log(secret_idx=session.secret_idx, guesses=session.guesses, started=session.started)
+        session.secret_idx = self._random_secret_idx()
+        session.guesses = []
+        session.started = time.time()
+
+
+    def restart_game(self, session_id: str) -> dict:
+        with self.backend.transaction():
+            session = self.get(session_id)
+            response = self._restart(session)
+            self.backend.put(session_id, session)
+        return response
+
+
+    def make_guess(self, session_id: str, guess: str) -> dict:
+        """Same as WordleGame.make_guess, but for the game of the session"""
+        with self.backend.transaction():
+            session = self.get(session_id)
+            response = self._guess(session, guess)
+            self.backend.put(session_id, session)
+        return response
+
+
+    def _check_guess(self, session: GameSession, guess: str) -> None:
+        """Raises ValueError if the guess breaks the rules of the game"""
+        secret_word = self.word_list[session.secret_idx]
+        if len(guess) != len(secret_word) or not (guess.isascii() and guess.isalpha() and guess.islower()):
+            raise ValueError(f"Guess must be exactly {len(secret_word)} letters!")
+        if self.allowed_guesses is not None and guess not in self.allowed_guesses:
+            raise ValueError("Not in word list!")
+        
+        # In hard mode every revealed hint must be used in the following guesses
+        if self.hard_mode:
+            constraints = ConstraintState(word_length=len(secret_word))
+            for previous in session.guesses:
+                constraints.merge(word=previous, feedback=WordleGame.compute_feedback(guess=previous, secret_word=secret_word))
+            violation = constraints.hard_mode_violation(guess)
+            if violation is not None:
+                raise ValueError(f"Hard mode: {violation}!")
+
+
+    def _guess(self, session: GameSession, guess: str) -> dict:
+        self._check_guess(session, guess)
+        secret_word = self.word_list[session.secret_idx]
+        
+        # Save guess
+        session.guesses.append(guess)
+        
+        # Return response, restarting the game once it is over
+        response = {
+            "guess": guess,
+            "feedback": WordleGame.compute_feedback(guess=guess, secret_word=secret_word),
+            "guesses_used": len(session.guesses),
+            "is_correct": guess == secret_word,
+            "out_of_guesses": len(session.guesses) >= self.max_guesses,
+            "game_summary": None,
+        }
+        if response["is_correct"] or response["out_of_guesses"]:
+            response["game_summary"] = self._restart(session, finished=True)
+        return response
+
+
+    def status(self, session_id: str) -> dict:
+        session = self.get(session_id)
+        return {
+            "session_id": session_id,
+            "guesses": session.guesses,
+            "guesses_used": len(session.guesses),
+            "secret_word": self.word_list[session.secret_idx],
+        }
+
+
+    def make_guesses(self, session_ids: list[str], guesses: list[str]) -> tuple[np.ndarray, np.ndarray, dict[int, str]]:
+        """Applies many (session, guess) pairs in order, scoring them in one vectorized pass.
+        Returns the feedback codes and guesses used per pair (invalid_code and 0 for failed pairs) and the errors by pair index."""
+
+        word_length = len(self.word_list[0])
+        codes = np.full(len(guesses), invalid_code(word_length), dtype=feedback_dtype(word_length))
+        guesses_used = np.zeros(len(guesses), dtype=np.uint8)
+        errors = {}
+
+        # The whole batch is one transaction of the backend
+        with self.backend.transaction():
+            self._make_guesses(session_ids, guesses, codes, guesses_used, errors)
+        return codes, guesses_used, errors
+
+
+    def _make_guesses(self, session_ids, guesses, codes, guesses_used, errors) -> None:
+        word_length = len(self.word_list[0])
+
+        # Look up the sessions and validate the guesses first, each session is loaded once even if it guesses repeatedly
+        valid, sessions, secret_idxs = [], [], []
+        loaded = {}
+        for i, (session_id, guess) in enumerate(zip(session_ids, guesses)):
+            try:
+                if session_id not in loaded:
+                    loaded[session_id] = self.get(session_id)
+                session = loaded[session_id]
+            except KeyError:
+                errors[i] = f"Game session '{session_id}' not found"
+                continue
+            if len(guess) != word_length or not (guess.isascii() and guess.isalpha() and guess.islower()):
+                errors[i] = f"Guess must be exactly {word_length} letters!"
+                continue
+            
+            # Hard mode depends on the guesses before within the batch, so those pairs are played one by one
+            if self.hard_mode:
+                try:
+                    response = self._guess(session, guess)
+                except ValueError as e:
+                    errors[i] = str(e)
+                    continue
+                codes[i] = encode_feedback(response["feedback"])
+                guesses_used[i] = response["guesses_used"]
+                continue
+            if self.allowed_guesses is not None and guess not in self.allowed_guesses:
+                errors[i] = "Not in word list!"
+                continue
+            valid.append(i)
+            sessions.append(session)
+            secret_idxs.append(session.secret_idx)
+
+        if valid:
+            codes[valid] = compute_pair_feedback_codes(
+                WordListEngine.encode_words([guesses[i] for i in valid]),
+                WordListEngine.encode_words([self.word_list[idx] for idx in secret_idxs]),
+            )
+
+        # Apply the guesses in order, a session guessing again after its game restarted within the batch is rescored
+        solved = solved_code(word_length)
+        for i, session, secret_idx in zip(valid, sessions, secret_idxs):
+            if session.secret_idx != secret_idx:
+                codes[i] = compute_pair_feedback_codes(
+                    WordListEngine.encode_words([guesses[i]]),
+                    WordListEngine.encode_words([self.word_list[session.secret_idx]]),
+                )[0]
+            session.guesses.append(guesses[i])
+            guesses_used[i] = len(session.guesses)
+            if codes[i] == solved or len(session.guesses) >= self.max_guesses:
+                self._new_game(session, finished=True)
+
+        for session_id, session in loaded.items():
+            self.backend.put(session_id, session)
+
@@ -0,0 +1,231 @@
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager, nullcontext
+
+
+class GameSession:
+    """State of one game, the secret word is held as an index into the shared word list"""
+
+    __slots__ = ("secret_idx", "guesses", "last_access", "started")
+
+    def __init__(self, secret_idx: int, guesses: list[str] | None = None, last_access: float = 0.0, started: float | None = None) -> None:
+        self.secret_idx = secret_idx
+        self.guesses = [] if guesses is None else guesses
+        self.last_access = last_access
+        self.started = time.time() if started is None else started
+
+
+
+class MemoryBackend:
+    """Games held in this process' memory, evicting games idle for longer than ttl and the least recently used ones above max_sessions.
+    Only usable with a single server worker, as every process has its own games."""
+
+    def __init__(self, ttl: float = 3600.0, max_sessions: int = 500_000) -> None:
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+
+        # Ordered from least to most recently used, so evictions pop from the front
+        self.sessions: OrderedDict[str, GameSession] = OrderedDict()
+
+
+    def __len__(self) -> int:
+        return len(self.sessions)
+
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self.sessions
+
+
+    def transaction(self):
+        """Groups the reads and writes of one request, a no-op as the games are only touched by this process"""
+        return nullcontext()
+
+
+    def _evict(self, now: float) -> None:
+        while self.sessions:
+            session_id, session = next(iter(self.sessions.items()))
+            if now - session.last_access < self.ttl and len(self.sessions) < self.max_sessions:
+                break
+            del self.sessions[session_id]
+
+
+    def get(self, session_id: str) -> GameSession:
+        """Looks up a live game, raising KeyError if it does not exist or has expired"""
+        now = time.monotonic()
+        session = self.sessions[session_id]
+        if now - session.last_access >= self.ttl:
+            del self.sessions[session_id]
+            raise KeyError(session_id)
+        session.last_access = now
+        self.sessions.move_to_end(session_id)
+        return session
+
+
+    def put(self, session_id: str, session: GameSession) -> None:
+        """Stores a new or changed game"""
+        now = time.monotonic()
+        if session_id not in self.sessions:
+            self._evict(now)
+        session.last_access = now
+        self.sessions[session_id] = session
+        self.sessions.move_to_end(session_id)
+
+
+    def delete(self, session_id: str) -> None:
+        del self.sessions[session_id]
+
+
+
+class SQLiteBackend:
+    """Games held in a SQLite database, shared by every worker process of the server.
+    Each request's reads and writes run in one immediate transaction, so concurrent guesses on a game never get lost.
+    Putting the database on a tmpfs (e.g. /dev/shm) keeps it in shared memory."""
+
+    def __init__(self,
+                 path: str,
+                 table: str = "sessions",
+                 ttl: float = 3600.0,
+                 max_sessions: int = 500_000,
+                 purge_every: int = 1000,
+                 ) -> None:
+        if not table.isidentifier():
+            raise ValueError(f"Invalid table name '{table}'")
+        self.path = str(path)
+        self.table = table
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.purge_every = purge_every
+
+        self._lock = threading.RLock()
+        self._connection = None
+        self._pid = None
+        self._depth = 0
+        self._puts = 0
+
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """This process' connection, reopened after a fork so workers never share one"""
+        if self._connection is None or self._pid != os.getpid():
+            connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False, timeout=30.0)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} "
+                "(session_id TEXT PRIMARY KEY, secret_idx INTEGER NOT NULL, guesses TEXT NOT NULL, last_access REAL NOT NULL, "
+                "started REAL NOT NULL DEFAULT 0)"
+            )
+            connection.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_last_access ON {self.table} (last_access)")
+            self._migrate(connection)
+            self._connection, self._pid, self._depth = connection, os.getpid(), 0
+        return self._connection
+
+
+    def _migrate(self, connection: sqlite3.Connection) -> None:
+        """Adds the columns missing from tables created by older versions"""
+        def columns():
+            return {row[1] for row in connection.execute(f"PRAGMA table_info({self.table})")}
+
+        if "started" not in columns():
+            try:
+                connection.execute(f"ALTER TABLE {self.table} ADD COLUMN started REAL NOT NULL DEFAULT 0")
+            except sqlite3.OperationalError:
+                # Fine if another worker added it meanwhile
+                if "started" not in columns():
+                    raise
+
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self.connection.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+
+    def __contains__(self, session_id: str) -> bool:
+        with self._lock:
+            row = self.connection.execute(f"SELECT 1 FROM {self.table} WHERE session_id = ?", (session_id,)).fetchone()
+        return row is not None
+
+
+    @contextmanager
+    def transaction(self):
+        """Runs the enclosed reads and writes atomically, locking out the other workers' writes meanwhile"""
+        with self._lock:
+            connection = self.connection
+            if self._depth == 0:
+                connection.execute("BEGIN IMMEDIATE")
+            self._depth += 1
+            try:
+                yield
+            except BaseException:
+                self._depth -= 1
+                if self._depth == 0:
+                    connection.execute("ROLLBACK")
+                raise
+            self._depth -= 1
+            if self._depth == 0:
+                connection.execute("COMMIT")
+
+
+    def _purge(self, now: float) -> None:
+        """Drops expired games, then the least recently used ones above max_sessions"""
+        connection = self.connection
+        if math.isfinite(self.ttl):
+            connection.execute(f"DELETE FROM {self.table} WHERE last_access <= ?", (now - self.ttl,))
+        excess = connection.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0] - self.max_sessions
+        if excess > 0:
+            connection.execute(
+                f"DELETE FROM {self.table} WHERE session_id IN "
+                f"(SELECT session_id FROM {self.table} ORDER BY last_access LIMIT ?)",
+                (excess,),
+            )
+
+
+    def get(self, session_id: str) -> GameSession:
+        """Looks up a live game, raising KeyError if it does not exist or has expired"""
+        now = time.time()
+        with self.transaction():
+            row = self.connection.execute(
+                f"SELECT secret_idx, guesses, last_access, started FROM {self.table} WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            if row is None:
+                raise KeyError(session_id)
+            secret_idx, guesses, last_access, started = row
+            if now - last_access >= self.ttl:
+                self.connection.execute(f"DELETE FROM {self.table} WHERE session_id = ?", (session_id,))
+                raise KeyError(session_id)
+            self.connection.execute(f"UPDATE {self.table} SET last_access = ? WHERE session_id = ?", (now, session_id))
+        return GameSession(secret_idx, self._decode_guesses(guesses), now, started)
+
+
+    @staticmethod
+    def _decode_guesses(guesses: str) -> list[str]:
+        # Stored as a json list, rows written by older versions hold comma joined guesses
+        if guesses.startswith("["):
+            return json.loads(guesses)
+        return guesses.split(",") if guesses else []
+
+
+    def put(self, session_id: str, session: GameSession) -> None:
+        """Stores a new or changed game"""
+        now = time.time()
+        session.last_access = now
+        with self.transaction():
+            self.connection.execute(
+                f"INSERT OR REPLACE INTO {self.table} (session_id, secret_idx, guesses, last_access, started) VALUES (?, ?, ?, ?, ?)",
+                (session_id, int(session.secret_idx), json.dumps(session.guesses), now, session.started),
+            )
+            self._puts += 1
+            if self._puts % self.purge_every == 0:
+                self._purge(now)
+
+
+    def delete(self, session_id: str) -> None:
+        with self.transaction():
+            cursor = self.connection.execute(f"DELETE FROM {self.table} WHERE session_id = ?", (session_id,))
+        if cursor.rowcount == 0:
+            raise KeyError(session_id)
@@ -0,0 +1,174 @@
+import argparse
+import asyncio
+import json
+import time
+from collections import defaultdict
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+import numpy as np
+
+from benchmark import git_revision, local_server, summarize
+from solver import WordleSolver
+
+
+class LoadStats:
+    """Latencies and failures per endpoint, recorded by every player of a load stage"""
+
+    def __init__(self) -> None:
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.games = 0
+        self.solved = 0
+
+
+    async def request(self, client: httpx.AsyncClient, endpoint: str, method: str, url: str, **kwargs) -> httpx.Response | None:
+        """Sends a request, timing it under the endpoint label. Failed requests are counted and give None."""
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            response = None
+        self.latencies[endpoint].append(time.perf_counter() - start)
+        if response is None or response.status_code >= 400:
+            self.errors[endpoint] += 1
+            return None
+        return response
+
+
+    def report(self, wall_time: float) -> dict:
+        endpoints = {}
+        for endpoint, samples in sorted(self.latencies.items()):
+            endpoints[endpoint] = summarize(samples) | {
+                "requests_per_s": len(samples) / wall_time if wall_time else 0.0,
+                "errors": self.errors[endpoint],
+                "error_rate": self.errors[endpoint] / len(samples),
+            }
+        n_requests = sum(len(samples) for samples in self.latencies.values())
+        return {
+            "wall_time": wall_time,
+            "games": self.games,
+            "games_per_s": self.games / wall_time if wall_time else 0.0,
+            "success_rate": self.solved / self.games if self.games else 0.0,
+            "requests": n_requests,
+            "requests_per_s": n_requests / wall_time if wall_time else 0.0,
+            "error_rate": sum(self.errors.values()) / n_requests if n_requests else 0.0,
+            "endpoints": endpoints,
+        }
+
+
+
+async def play_game(client: httpx.AsyncClient, base_url: str, stats: LoadStats, solver: WordleSolver | None,
+                    trace: list[str] | None) -> None:
+    """Plays one session game, guessing with the solver or replaying a recorded guess trace"""
+
+    response = await stats.request(client, "POST /games", "POST", f"{base_url}/games")
+    if response is None:
+        return
+    session_id = response.json()["session_id"]
+    stats.games += 1
+
+    try:
+        for turn in range(len(trace) if trace is not None else solver.max_guesses):
+            guess = trace[turn] if trace is not None else solver._next_guess()
+            response = await stats.request(client, "POST /games/{session_id}/guess", "POST",
+                                           f"{base_url}/games/{session_id}/guess", json={"guess": guess})
+            if response is None:
+                return
+            result = response.json()
+            if result["is_correct"]:
+                stats.solved += 1
+                return
+            if result["out_of_guesses"]:
+                return
+            if solver is not None:
+                solver._apply_feedback(guess=guess, feedback=result["feedback"])
+    finally:
+        await stats.request(client, "DELETE /games/{session_id}", "DELETE", f"{base_url}/games/{session_id}")
+
+
+async def run_stage(base_url: str, concurrency: int, duration: float, template: WordleSolver | None,
+                    traces: list[list[str]] | None, seed: int) -> dict:
+    """Keeps concurrency players busy with back to back games for duration seconds"""
+
+    stats = LoadStats()
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    deadline = time.perf_counter() + duration
+
+    async with httpx.AsyncClient(limits=limits, timeout=30.0) as client:
+
+        async def player(player_index: int) -> None:
+            random_gen = np.random.default_rng([seed, player_index])
+            while time.perf_counter() < deadline:
+                if traces is not None:
+                    await play_game(client, base_url, stats, None, traces[random_gen.integers(len(traces))])
+                else:
+                    solver = template.spawn(seed=random_gen.integers(2**63))
+                    await play_game(client, base_url, stats, solver, None)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(player(player_index) for player_index in range(concurrency)))
+        return {"concurrency": concurrency} | stats.report(time.perf_counter() - start)
+
+
+def load_traces(path: Path) -> list[list[str]]:
+    """Recorded games as a json list of guess lists, e.g. [["tales", "crane"], ...]"""
+    with open(path, "r") as file:
+        traces = json.load(file)
+    if not traces or not all(isinstance(trace, list) and trace for trace in traces):
+        raise ValueError(f"'{path}' must hold a non-empty list of guess lists")
+    return traces
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ramp up concurrent solver games against the wordle game api and measure it")
+    parser.add_argument("--url", default=None, help="Base url of a running server, otherwise a local one is started")
+    parser.add_argument("--server-workers", type=int, default=1, help="Uvicorn workers of the local server")
+    parser.add_argument("--concurrency", type=lambda s: [int(c) for c in s.split(",")], default=[1, 4, 16, 64],
+                        help="Comma separated concurrent players per stage")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per stage")
+    parser.add_argument("--guess-strategy", default="random")
+    parser.add_argument("--seed-word-strategy", type=int, default=1)
+    parser.add_argument("--traces", type=Path, default=None, help="Replay recorded guess traces instead of solving")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=Path, default=None, help="Result file, defaults to bench_results/loadtest_<timestamp>.json")
+    args = parser.parse_args()
+
+    traces = load_traces(args.traces) if args.traces is not None else None
+    template = None
+    if traces is None:
+        template = WordleSolver(seed_word_strategy=args.seed_word_strategy, guess_strategy=args.guess_strategy)
+
+    timestamp = datetime.now(timezone.utc)
+    results = {
+        "timestamp": timestamp.isoformat(),
+        "git_revision": git_revision(),
+        "config": {key: str(value) if isinstance(value, Path) else value for key, value in vars(args).items()},
+        "stages": [],
+    }
+
+    server = local_server(workers=args.server_workers) if args.url is None else nullcontext((args.url, None))
+    with server as (base_url, startup_time):
+        results["server_startup_time"] = startup_time
+        for concurrency in args.concurrency:
+            print(f"Running {concurrency} concurrent players for {args.duration:.0f}s...")
+            stage = asyncio.run(run_stage(base_url, concurrency, args.duration, template, traces, args.seed))
+            results["stages"].append(stage)
+            print(f"   {stage['games_per_s']:.1f} games/s, {stage['requests_per_s']:.1f} requests/s, "
+                  f"{stage['error_rate']:.2%} errors")
+            for endpoint, summary in stage["endpoints"].items():
+                print(f"   {endpoint:<32} p50 {summary['p50']*1e3:8.2f}ms   p90 {summary['p90']*1e3:8.2f}ms   "
+                      f"p99 {summary['p99']*1e3:8.2f}ms   {summary['error_rate']:.2%} errors")
+
+    output = args.output or Path("bench_results") / f"loadtest_{timestamp.strftime('%Y%m%dT%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w") as file:
+        json.dump(results, file, indent=4)
+    print(f"Saved results to '{output}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+import cProfile
+import io
+import os
+import pstats
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+
+# Upper bounds (in seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+class Histogram:
+    __slots__ = ("count", "sum", "bucket_counts")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.sum = 0.0
+        self.bucket_counts = [0] * len(LATENCY_BUCKETS)
+
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound:
+                self.bucket_counts[i] += 1
+                break
+
+
+
+class MetricsRegistry:
+    """Counters and latency histograms for the hot paths, exported in the Prometheus text format.
+    While disabled, the hooks only check a flag before calling through."""
+
+    def __init__(self, enabled: bool = False, prefix: str = "wordle") -> None:
+        self.enabled = enabled
+        self.prefix = prefix
+        self.counters: dict[tuple[str, tuple], float] = {}
+        self.histograms: dict[tuple[str, tuple], Histogram] = {}
+        self._lock = threading.Lock()
+
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+
+    def observe(self, name: str, seconds: float, **labels) -> None:
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram()
+            self.histograms[key].observe(seconds)
+
+
+    def timer(self, name: str, **labels):
+        """Context manager timing a block into the histogram name"""
+        if not self.enabled:
+            return nullcontext()
+        return self._timer(name, **labels)
+
+
+    @contextmanager
+    def _timer(self, name: str, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+
+    def timed(self, name: str):
+        """Decorator timing every call of the function into the histogram name"""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.observe(name, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+
+    @staticmethod
+    def _format_labels(labels: tuple, extra: str = "") -> str:
+        parts = [f'{key}="{value}"' for key, value in labels]
+        if extra:
+            parts.append(extra)
+        return "{" + ",".join(parts) + "}" if parts else ""
+
+
+    def render_prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(self.histograms.items(), key=lambda item: item[0])
+
+        declared = set()
+        for (name, labels), value in counters:
+            metric = f"{self.prefix}_{name}_total"
+            if metric not in declared:
+                lines.append(f"# TYPE {metric} counter")
+                declared.add(metric)
+            lines.append(f"{metric}{self._format_labels(labels)} {value}")
+
+        for (name, labels), histogram in histograms:
+            metric = f"{self.prefix}_{name}_seconds"
+            if metric not in declared:
+                lines.append(f"# TYPE {metric} histogram")
+                declared.add(metric)
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), histogram.bucket_counts + [histogram.count - sum(histogram.bucket_counts)]):
+                cumulative += count
+                bucket_labels = self._format_labels(labels, f'le="{bound}"')
+                lines.append(f"{metric}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{metric}_sum{self._format_labels(labels)} {histogram.sum}")
+            lines.append(f"{metric}_count{self._format_labels(labels)} {histogram.count}")
+
+        return "\n".join(lines) + "\n"
+
+
+
+class RequestProfiler:
+    """Runs a sampled fraction of the requests under cProfile, keeping the stats of the most recent ones"""
+
+    def __init__(self, sample_rate: float = 0.0, keep: int = 20, top: int = 30) -> None:
+        self.sample_rate = sample_rate
+        self.top = top
+        self.results = deque(maxlen=keep)
+        # Only one profile may run per interpreter, concurrent requests on the event loop would otherwise overlap
+        self.active = None
+
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0
+
+
+    def should_profile(self) -> bool:
+        return self.sample_rate > 0 and self.active is None and random.random() < self.sample_rate
+
+
+    def start(self) -> cProfile.Profile | None:
+        """Starts profiling, None if a profile (or another profiling tool) is already active"""
+        if self.active is not None:
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            return None
+        self.active = profile
+        return profile
+
+
+    def stop(self, profile: cProfile.Profile, name: str | None = None, seconds: float = 0.0) -> None:
+        """Stops the profile, keeping its stats if a name is given"""
+        profile.disable()
+        if self.active is profile:
+            self.active = None
+        if name is None:
+            return
+        stream = io.StringIO()
+        pstats.Stats(profile, stream=stream).sort_stats("cumulative").print_stats(self.top)
+        self.results.append({"name": name, "seconds": seconds, "stats": stream.getvalue()})
+
+
+
+# Process wide instances, metrics can be switched on at startup with WORDLE_METRICS=1
+metrics = MetricsRegistry(enabled=os.environ.get("WORDLE_METRICS", "0") == "1")
+profiler = RequestProfiler()
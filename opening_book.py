@@ -0,0 +1,140 @@
+import argparse
+import json
+from pathlib import Path
+
+import numpy as np
+
+from feedback import FeedbackMatrix, solved_code, word_list_hash
+from strategies import get_strategy
+from word_list import DATA_DIR
+
+
+class OpeningBook:
+    """Precomputed decision tree mapping the feedback history of a game to the next guess"""
+
+    def __init__(self, seed_words: list[str], strategy: str, word_list_hash: str, tree: dict[str, str]) -> None:
+        self.seed_words = seed_words
+        self.strategy = strategy
+        self.word_list_hash = word_list_hash
+        self.tree = tree
+
+
+    @staticmethod
+    def history_key(history: list[int]) -> str:
+        """Canonical key of a feedback code history, e.g. [12, 45] -> '12,45'"""
+        return ",".join(str(code) for code in history)
+
+
+    def lookup(self, history: list[int]) -> str | None:
+        """The next guess for the feedback history, or None if the branch is not part of the book"""
+        return self.tree.get(self.history_key(history))
+
+
+    @classmethod
+    def build(cls,
+              feedback_matrix: FeedbackMatrix,
+              strategy: str = "entropy",
+              seed_words: list[str] | None = None,
+              depth: int = 2,
+              max_guesses: int = 6,
+              seed=None,
+              verbose: bool = False,
+              ) -> "OpeningBook":
+        """Walks the game tree from the seed words, recording the strategy's guess for the first depth moves after them.
+        Without seed words the strategy's best opening on the full word list is used."""
+
+        guess_strategy = get_strategy(strategy)
+        random_gen = np.random.default_rng(seed=seed)
+        all_candidates = np.arange(len(feedback_matrix.answer_words))
+        solved = solved_code(feedback_matrix.word_length)
+
+        if seed_words is None:
+            seed_words = [guess_strategy.choose(all_candidates, feedback_matrix.answer_words, random_gen, feedback_matrix)]
+        for seed_word in seed_words:
+            if seed_word not in feedback_matrix.guess_index:
+                raise ValueError(f"Seed word '{seed_word}' is not in the word list")
+
+        tree = {}
+        stack = [([], all_candidates)]
+        while stack:
+            history, candidates = stack.pop()
+            guesses_made = len(history)
+
+            # Seed words are played regardless of the feedback, afterwards the strategy decides
+            if guesses_made < len(seed_words):
+                guess = seed_words[guesses_made]
+            elif guesses_made - len(seed_words) >= depth or guesses_made >= max_guesses or len(candidates) <= 2:
+                continue
+            else:
+                guess = guess_strategy.choose(candidates, feedback_matrix.answer_words, random_gen, feedback_matrix)
+                tree[cls.history_key(history)] = guess
+
+            # Partition the candidates by the feedback the guess would receive
+            codes = feedback_matrix.matrix[feedback_matrix.guess_index[guess], candidates]
+            for code in np.unique(codes):
+                if code != solved:
+                    stack.append((history + [int(code)], candidates[codes == code]))
+
+        if verbose: print(f"Opening book from {seed_words} with '{strategy}' has {len(tree)} positions")
+
+        return cls(
+            seed_words=list(seed_words),
+            strategy=strategy,
+            word_list_hash=word_list_hash(feedback_matrix.guess_words, feedback_matrix.answer_words),
+            tree=tree,
+        )
+
+
+    def save(self, path: Path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as file:
+            json.dump({
+                "seed_words": self.seed_words,
+                "strategy": self.strategy,
+                "word_list_hash": self.word_list_hash,
+                "tree": self.tree,
+            }, file, separators=(",", ":"))
+
+
+    @classmethod
+    def load(cls, path: Path, feedback_matrix: FeedbackMatrix | None = None) -> "OpeningBook":
+        """Loads a saved book, checking it was built for the word lists of the feedback matrix if given"""
+
+        with open(path, "r") as file:
+            book = cls(**json.load(file))
+
+        if feedback_matrix is not None:
+            expected_hash = word_list_hash(feedback_matrix.guess_words, feedback_matrix.answer_words)
+            if book.word_list_hash != expected_hash:
+                raise ValueError(f"Opening book '{path}' was built for a different word list, rebuild it")
+
+        return book
+
+
+
+def main():
+    from solver import SEED_WORDS, WordleSolver
+
+    parser = argparse.ArgumentParser(description="Build an opening book for the WordleSolver")
+    parser.add_argument("--strategy", default="entropy", help="Guess strategy used to pick the moves")
+    parser.add_argument("--seed-word-strategy", type=int, default=None, choices=list(SEED_WORDS),
+                        help="Start from these seed words instead of the strategy's best opening")
+    parser.add_argument("--depth", type=int, default=2, help="Number of moves after the seed words to precompute")
+    parser.add_argument("--output", type=Path, default=DATA_DIR / "opening_book.json")
+    args = parser.parse_args()
+
+    solver = WordleSolver(seed_word_strategy=args.seed_word_strategy or 0, guess_strategy=args.strategy)
+    book = OpeningBook.build(
+        feedback_matrix=solver.feedback_matrix,
+        strategy=args.strategy,
+        seed_words=solver.seed_words or None,
+        depth=args.depth,
+        verbose=True,
+    )
+    book.save(args.output)
+    print(f"Saved opening book to '{args.output}'")
+
+
+if __name__ == "__main__":
+    main()
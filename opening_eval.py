@@ -0,0 +1,242 @@
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+from pathlib import Path
+
+import numpy as np
+
+from feedback import FeedbackMatrix, word_list_hash
+from strategies import histogram_rows
+from word_list import DATA_DIR, default_word_list_api, default_word_list_path, get_word_list
+
+# Opening words scored per task, also the unit of checkpointing
+SHARD_SIZE = 256
+
+# Metrics reported per opening, and whether lower values rank first
+METRICS = {
+    "expected_size": True,   # Expected number of candidates left after the opening
+    "entropy": False,        # Expected information in bits
+    "worst_case": True,      # Size of the largest feedback partition
+    "partitions": False,     # Number of distinct feedback outcomes
+}
+
+
+# Per worker process matrix, memmapped once by the pool initializer so every worker shares the page cache
+_matrix = None
+
+
+def _init_worker(matrix_path: str) -> None:
+    global _matrix
+    _matrix = np.load(matrix_path, mmap_mode="r")
+
+
+def partition_metrics(counts: np.ndarray, n_answers: int) -> np.ndarray:
+    """Metrics of (R, bins) partition size histograms -> (R, len(METRICS)) in the order of METRICS"""
+    counts = np.asarray(counts, dtype=np.float64)
+    p = counts / n_answers
+    with np.errstate(divide="ignore", invalid="ignore"):
+        entropy = -np.where(p > 0, p * np.log2(p), 0.0).sum(axis=1)
+    return np.stack([
+        (counts * counts).sum(axis=1) / n_answers,
+        entropy,
+        counts.max(axis=1),
+        (counts > 0).sum(axis=1),
+    ], axis=1)
+
+
+def _score_singles(start: int, stop: int, n_patterns: int) -> list:
+    """Worker: scores the single word openings start..stop against every answer"""
+    counts = histogram_rows(np.asarray(_matrix[start:stop]), n_patterns)
+    scores = partition_metrics(counts, _matrix.shape[1])
+    return [[[guess_idx], *row] for guess_idx, row in zip(range(start, stop), scores.tolist())]
+
+
+def _score_combos(combos: list[tuple[int, ...]], n_patterns: int) -> list:
+    """Worker: scores multi word openings, the answers are partitioned by the combined feedback of all the words"""
+    results = []
+    for combo in combos:
+        codes = np.zeros(_matrix.shape[1], dtype=np.int64)
+        for guess_idx in combo:
+            codes = codes * n_patterns + _matrix[guess_idx]
+        _, counts = np.unique(codes, return_counts=True)
+        results.append([list(combo), *partition_metrics(counts[None, :], _matrix.shape[1])[0].tolist()])
+    return results
+
+
+class OpeningEvaluator:
+    """Exhaustively scores opening words, and the top-K pairs and triples built from them, against every answer.
+    Every finished shard is checkpointed to disk, so an interrupted run picks up where it stopped."""
+
+    def __init__(self,
+                 feedback_matrix: FeedbackMatrix,
+                 rank_by: str = "expected_size",
+                 checkpoint_dir: Path | None = None,
+                 workers: int | None = None,
+                 verbose: bool = False,
+                 ) -> None:
+
+        if rank_by not in METRICS:
+            raise ValueError(f"Unknown metric '{rank_by}', choose one of: {', '.join(METRICS)}")
+        if feedback_matrix.path is None:
+            raise ValueError("The feedback matrix must be loaded from disk, so the workers can memmap it")
+
+        self.feedback_matrix = feedback_matrix
+        self.rank_by = rank_by
+        self.workers = workers or os.cpu_count() or 1
+        self.verbose = verbose
+        self.n_patterns = 3 ** feedback_matrix.word_length
+        self.word_list_hash = word_list_hash(feedback_matrix.guess_words, feedback_matrix.answer_words)
+
+        # Checkpoints are tied to the word lists, a changed list starts from scratch
+        if checkpoint_dir is None:
+            checkpoint_dir = feedback_matrix.path.parent / f"opening_eval_{self.word_list_hash}"
+        self.checkpoint_dir = Path(checkpoint_dir)
+
+
+    def _run_stage(self, stage: str, func, shards: list[tuple]) -> list:
+        """Runs func over the shards in a process pool, skipping the shards checkpointed by an earlier run"""
+
+        self.checkpoint_dir.mkdir(parents=True, exist_ok=True)
+        paths = [self.checkpoint_dir / f"{stage}_{i:05d}.json" for i in range(len(shards))]
+        results = [None] * len(shards)
+        for i, path in enumerate(paths):
+            if path.exists():
+                with open(path, "r") as file:
+                    results[i] = json.load(file)
+
+        todo = [i for i in range(len(shards)) if results[i] is None]
+        if self.verbose: print(f"{stage}: {len(shards) - len(todo)}/{len(shards)} shards checkpointed, scoring {len(todo)}...")
+
+        def save(i, result):
+            results[i] = result
+            tmp_path = paths[i].with_suffix(".tmp")
+            with open(tmp_path, "w") as file:
+                json.dump(result, file, separators=(",", ":"))
+            os.replace(tmp_path, paths[i])
+
+        if todo and (self.workers == 1 or len(todo) == 1):
+            _init_worker(str(self.feedback_matrix.path))
+            for i in todo:
+                save(i, func(*shards[i], self.n_patterns))
+        elif todo:
+            with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                     initargs=(str(self.feedback_matrix.path),)) as executor:
+                futures = {i: executor.submit(func, *shards[i], self.n_patterns) for i in todo}
+                for i, future in futures.items():
+                    save(i, future.result())
+
+        return [record for result in results for record in result]
+
+
+    def _rank(self, records: list) -> list[dict]:
+        """Orders the records best first by the rank metric, breaking ties on the other metrics in order"""
+        keys = [(name, 1 if lower_first else -1) for name, lower_first in METRICS.items()]
+        keys.sort(key=lambda key: key[0] != self.rank_by)
+        ranked = [{"words": [self.feedback_matrix.guess_words[i] for i in record[0]], **dict(zip(METRICS, record[1:]))}
+                  for record in records]
+        ranked.sort(key=lambda entry: tuple(sign * entry[name] for name, sign in keys))
+        return ranked
+
+
+    def evaluate_singles(self) -> list[dict]:
+        n_guesses = self.feedback_matrix.matrix.shape[0]
+        shards = [(start, min(start + SHARD_SIZE, n_guesses)) for start in range(0, n_guesses, SHARD_SIZE)]
+        return self._rank(self._run_stage("singles", _score_singles, shards))
+
+
+    def _evaluate_combos(self, stage: str, combos: list[tuple[int, ...]]) -> list[dict]:
+        shards = [(combos[i:i + SHARD_SIZE],) for i in range(0, len(combos), SHARD_SIZE)]
+        return self._rank(self._run_stage(stage, _score_combos, shards))
+
+
+    def evaluate(self, top_k: int = 50, max_words: int = 3) -> dict[int, list[dict]]:
+        """Ranked openings per number of words. Pairs combine the top_k single words,
+        triples extend the top_k pairs with each of the top_k single words."""
+
+        guess_index = self.feedback_matrix.guess_index
+        rankings = {1: self.evaluate_singles()}
+        top_words = [guess_index[entry["words"][0]] for entry in rankings[1][:top_k]]
+
+        if max_words >= 2:
+            pairs = list(combinations(sorted(top_words), 2))
+            rankings[2] = self._evaluate_combos(f"pairs_{self.rank_by}_k{top_k}", pairs)
+
+        if max_words >= 3:
+            triples = set()
+            for entry in rankings[2][:top_k]:
+                pair = [guess_index[word] for word in entry["words"]]
+                triples.update(tuple(sorted(pair + [word])) for word in top_words if word not in pair)
+            rankings[3] = self._evaluate_combos(f"triples_{self.rank_by}_k{top_k}", sorted(triples))
+
+        return rankings
+
+
+
+def seed_words_snippet(rankings: dict[int, list[dict]], measured: dict[int, dict] | None = None) -> str:
+    """Python source for a SEED_WORDS dict holding the best opening per number of words"""
+    lines = ["SEED_WORDS = {"]
+    for n_words, ranking in rankings.items():
+        words = "".join(f'"{word}", ' for word in ranking[0]["words"]).rstrip()
+        line = f"    {n_words}: [{words[:-1]},],"
+        if measured and n_words in measured:
+            line = f"{line:<36} # {measured[n_words]['success_rate']:.0%} success w/ {measured[n_words]['avg_guesses']:.2f} avg rounds"
+        lines.append(line)
+    lines.append("}")
+    return "\n".join(lines)
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exhaustively rank opening words on the word list")
+    parser.add_argument("--word-length", type=int, default=5)
+    parser.add_argument("--rank-by", default="expected_size", choices=list(METRICS))
+    parser.add_argument("--top-k", type=int, default=50, help="Best single words (and pairs) combined into pairs and triples")
+    parser.add_argument("--max-words", type=int, default=3, choices=[1, 2, 3], help="Longest opening sequence to evaluate")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--show", type=int, default=10, help="Rows of each ranked table to print")
+    parser.add_argument("--simulate", action="store_true", help="Measure the best openings by playing every word of the list")
+    parser.add_argument("--guess-strategy", default="random", help="Guess strategy after the opening, used by --simulate")
+    parser.add_argument("--output", type=Path, default=DATA_DIR / "opening_words.json")
+    args = parser.parse_args()
+
+    word_list_path = default_word_list_path(args.word_length)
+    word_store = get_word_list(word_list_path, default_word_list_api(args.word_length))
+    feedback_matrix = FeedbackMatrix.load_or_build(word_store.words, cache_dir=word_list_path.parent, verbose=True)
+    evaluator = OpeningEvaluator(feedback_matrix, rank_by=args.rank_by, workers=args.workers, verbose=True)
+    rankings = evaluator.evaluate(top_k=args.top_k, max_words=args.max_words)
+
+    measured = None
+    if args.simulate:
+        from simulation import simulate
+        measured = {}
+        for n_words, ranking in rankings.items():
+            print(f"Simulating {ranking[0]['words']}...")
+            result = simulate(guess_strategy=args.guess_strategy, guessed_words=ranking[0]["words"],
+                              word_length=args.word_length, workers=args.workers)
+            measured[n_words] = {key: result[key] for key in ("success_rate", "avg_guesses", "guess_histogram")}
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "w") as file:
+        json.dump({
+            "word_list_hash": evaluator.word_list_hash,
+            "rank_by": args.rank_by,
+            "top_k": args.top_k,
+            "measured": measured,
+            "rankings": rankings,
+        }, file, indent=4)
+
+    for n_words, ranking in rankings.items():
+        print(f"\nBest openings of {n_words} word(s) by {args.rank_by}:")
+        print(f"{'rank':>4}  {'words':<20} {'exp. size':>10} {'entropy':>8} {'worst':>6} {'parts':>6}")
+        for rank, entry in enumerate(ranking[:args.show], start=1):
+            print(f"{rank:>4}  {','.join(entry['words']):<20} {entry['expected_size']:>10.2f} {entry['entropy']:>8.3f} "
+                  f"{entry['worst_case']:>6.0f} {entry['partitions']:>6.0f}")
+
+    print(f"\nSaved rankings to '{args.output}', seed words for solver.py:\n")
+    print(seed_words_snippet(rankings, measured))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+import solver
+from feedback import decode_feedback, score_guess
+
+# Games handed to a worker process per task
+GAMES_PER_TASK = 64
+
+
+class SimulatedWordleSolver(solver.WordleSolver):
+    """WordleSolver playing against an in-process feedback oracle instead of a user or the wordle game api"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        if self.feedback_matrix is None:
+            raise ValueError("The simulation requires use_feedback_matrix=True")
+        self.secret_idx = 0
+
+
+    def _get_feedback(self, guess: str, verbose=False) -> str:
+        guess_idx = self.feedback_matrix.guess_index.get(guess)
+        if guess_idx is None:
+            # Guesses outside the word list are scored directly
+            return score_guess(guess, self.feedback_matrix.answer_words[self.secret_idx])
+        return decode_feedback(self.feedback_matrix.matrix[guess_idx, self.secret_idx], self.feedback_matrix.word_length)
+
+
+    def play(self, secret_idx: int, random_gen: np.random.Generator) -> int:
+        """Plays one game against the given secret, returning the guesses used or 0 if it was not solved"""
+        self.reset()
+        self.secret_idx = secret_idx
+        self.random_gen = random_gen
+        return self.guesses_used if self.solve() else 0
+
+
+
+# Per worker process solver, created once by the pool initializer
+_worker_solver = None
+
+
+def _init_worker(solver_kwargs: dict) -> None:
+    global _worker_solver
+    _worker_solver = SimulatedWordleSolver(**solver_kwargs)
+
+
+def _play_games(games: list[tuple[int, int]], seed: int) -> list[int]:
+    """Worker: plays (game_index, secret_idx) games, each with its own random generator derived from the game index"""
+    return [_worker_solver.play(secret_idx, np.random.default_rng([seed, game_index])) for game_index, secret_idx in games]
+
+
+def simulate(guess_strategy: str = "random",
+             seed_word_strategy: int = 1,
+             opening_book: str | Path | None = None,
+             guessed_words: list[str] | None = None,
+             answer_list_path: str | Path | None = None,
+             hard_mode: bool = False,
+             word_length: int = 5,
+             max_guesses: int = 6,
+             num_games: int | None = None,
+             seed: int | None = 42,
+             workers: int | None = None,
+             ) -> dict:
+    """Plays the solver against every word of the list (or num_games sampled words) across a process pool.
+    The results for a fixed seed do not depend on the number of workers."""
+
+    solver_kwargs = {
+        "seed_word_strategy": seed_word_strategy,
+        "guess_strategy": guess_strategy,
+        "opening_book": opening_book,
+        "guessed_words": guessed_words,
+        "answer_list_path": answer_list_path,
+        "hard_mode": hard_mode,
+        "word_length": word_length,
+        "max_guesses": max_guesses,
+    }
+    if seed is None:
+        seed = int(np.random.SeedSequence().entropy % 2**63)
+
+    start_time = time.perf_counter()
+    _init_worker(solver_kwargs)
+    n_words = len(_worker_solver.feedback_matrix.answer_words)
+
+    # Every word once, or a sample of them
+    if num_games is None or num_games >= n_words:
+        secrets = np.arange(n_words)
+    else:
+        secrets = np.sort(np.random.default_rng(seed).choice(n_words, size=num_games, replace=False))
+    games = list(enumerate(secrets.tolist()))
+    tasks = [games[i:i + GAMES_PER_TASK] for i in range(0, len(games), GAMES_PER_TASK)]
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        guesses = [g for task in tasks for g in _play_games(task, seed)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(solver_kwargs,)) as executor:
+            guesses = [g for result in executor.map(_play_games, tasks, [seed] * len(tasks)) for g in result]
+
+    guesses = np.array(guesses)
+    solved = guesses > 0
+    return {
+        "guess_strategy": guess_strategy,
+        "seed_word_strategy": seed_word_strategy,
+        "opening_book": None if opening_book is None else str(opening_book),
+        "guessed_words": guessed_words,
+        "answer_list_path": None if answer_list_path is None else str(answer_list_path),
+        "hard_mode": hard_mode,
+        "word_length": word_length,
+        "max_guesses": max_guesses,
+        "games": len(guesses),
+        "success_rate": float(solved.mean()) if len(guesses) else 0.0,
+        "avg_guesses": float(guesses[solved].mean()) if solved.any() else 0.0,
+        "guess_histogram": {int(n): int(count) for n, count in zip(*np.unique(guesses[solved], return_counts=True))},
+        "failures": int((~solved).sum()),
+        "wall_time": time.perf_counter() - start_time,
+        "secrets": secrets,
+        "guesses": guesses,
+    }
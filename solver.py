@@ -1,64 +1,122 @@
-import requests
-import json
+import copy
 import numpy as np
-from copy import deepcopy
 from pathlib import Path
+from constraints import ConstraintState
+from feedback import FeedbackMatrix, encode_feedback
+from metrics import metrics
+from opening_book import OpeningBook
+from strategies import get_strategy
+from word_engine import WordListEngine
+from word_list import default_word_list_api, default_word_list_path, get_word_list
+
+# The first tried out words per seed_word_strategy
+# https://www.sfi.ie/research-news/news/wordle-data-analytics/
+# Rank and measure openings on the current word list with: python opening_eval.py --simulate
+SEED_WORDS = {
+    1: ["tales",],                   # 95% success w/ 3.66 avg rounds 
+    2: ["cones", "trial",],          # 96% success w/ 3.68 avg rounds 
+    3: ["hates", "round", "climb",], # 97% success w/ 4.20 avg rounds 
+}
 
 class WordleSolver:
     def __init__(self,
                  seed_word_strategy: int = 1 ,
                  guessed_words: None | list[str] = None,
-                 word_list_api: str = "https://cheaderthecoder.github.io/5-Letter-words/words.json",
+                 word_list_api: str | None = None,
                  seed=None,
+                 use_feedback_matrix: bool = True,
+                 guess_strategy: str = "random",
+                 opening_book: str | Path | None = None,
+                 answer_list_path: str | Path | None = None,
+                 hard_mode: bool = False,
+                 word_length: int = 5,
+                 max_guesses: int = 6,
                  ):
         
-        # Init some class vars
-        self.word_list_path = Path("word_lists/words.json")
-        self.word_list_api = word_list_api
+        # Init some class vars, the word list and its api default to the ones of the word length
+        self.word_list_path = default_word_list_path(word_length)
+        self.word_list_api = word_list_api if word_list_api is not None else default_word_list_api(word_length)
+        self.word_length = word_length
+        self.max_guesses = max_guesses
         self.guesses_used = 0
+        self.feedback_history = []
         self.random_gen = np.random.default_rng(seed=seed)
+        self.guess_strategy = get_strategy(guess_strategy)
+        self.hard_mode = hard_mode
         
         # Define the first tried out words
-        # https://www.sfi.ie/research-news/news/wordle-data-analytics/
         if guessed_words is not None: self.seed_words = guessed_words                # If initialized with already guessed words
-        elif seed_word_strategy == 1: self.seed_words = ["tales",]                   # 95% success w/ 3.66 avg rounds 
-        elif seed_word_strategy == 2: self.seed_words = ["cones", "trial",]          # 96% success w/ 3.68 avg rounds 
-        elif seed_word_strategy == 3: self.seed_words = ["hates", "round", "climb",] # 97% success w/ 4.20 avg rounds 
+        elif seed_word_strategy in SEED_WORDS and word_length == 5: self.seed_words = list(SEED_WORDS[seed_word_strategy])
         else: 
             print("Using no seed words")
             self.seed_words = []
         
-        # Init letter dict, recording the knowledge gained from guessing
-        self.letter_dict = {
-            "gray": [],
-            "yellow": [],
-            "green": [],
-        }
+        # Obtain a word list of all english words of the length, encoded once for vectorized filtering
+        word_store = get_word_list(self.word_list_path, self.word_list_api)
+        if word_store.word_length != word_length:
+            raise ValueError(f"The word list '{self.word_list_path}' does not hold {word_length} letter words")
+        self.guess_engine = WordListEngine(word_store.words, letters=word_store.letter_codes())
         
-        # Obtain a word list of all english 5 letter words
-        self.word_list = self._get_word_list()
-        print("Starting word list length", len(self.word_list))
+        # The possible answers, a separate (usually smaller) list if given, otherwise every allowed guess
+        self.engine = self.guess_engine
+        if answer_list_path is not None:
+            answer_store = get_word_list(answer_list_path, word_list_api=None)
+            self.engine = WordListEngine(answer_store.words, letters=answer_store.letter_codes())
+        self.candidates = np.arange(len(self.engine))
         
+        # Init constraint state, recording the knowledge gained from guessing
+        self.constraints = ConstraintState(word_length=word_length)
         
-    def _get_word_list(self):
+        # Precomputed guess x answer feedback codes, turning filtering into a single row lookup
+        self.feedback_matrix = None
+        if self.guess_strategy.requires_feedback_matrix and not use_feedback_matrix:
+            raise ValueError(f"The '{guess_strategy}' guess strategy requires use_feedback_matrix=True")
+        if use_feedback_matrix:
+            self.feedback_matrix = FeedbackMatrix.load_or_build(self.guess_engine.words, self.engine.words, cache_dir=self.word_list_path.parent)
         
-        if self.word_list_path.exists():
-            with open(self.word_list_path, 'r') as file:
-                word_list = json.load(file)["words"]
+        # Precomputed decision tree for the first moves, its opening replaces the seed words
+        self.opening_book = None
+        if opening_book is not None:
+            self.opening_book = OpeningBook.load(opening_book, feedback_matrix=self.feedback_matrix)
+            self.seed_words = list(self.opening_book.seed_words)
         
-        else:
-            response = requests.get(self.word_list_api)
-            if response.status_code == 200:
-                print("Fetched word list from API")
-                word_list_json = response.json()
-                
-                with open(self.word_list_path, "w") as file:
-                    json.dump(word_list_json, file, indent=4)
-                word_list = word_list_json["words"]
-            else:
-                raise ValueError("Failed to fetch word list")
-        
-        return word_list
+    
+    def reset(self):
+        self.guesses_used = 0
+        self.feedback_history = []
+        self.candidates = np.arange(len(self.engine))
+        self.constraints = ConstraintState(word_length=self.word_length)
+        return True
+    
+    
+    def snapshot(self) -> tuple:
+        """Captures the game state in O(1), to branch off and later restore it"""
+        return self.guesses_used, tuple(self.feedback_history), self.candidates, self.constraints.snapshot()
+    
+    
+    def restore(self, snapshot: tuple) -> None:
+        guesses_used, feedback_history, self.candidates, constraints = snapshot
+        self.guesses_used = guesses_used
+        self.feedback_history = list(feedback_history)
+        self.constraints.restore(constraints)
+    
+    
+    def spawn(self, seed=None) -> "WordleSolver":
+        """A solver for a new game, sharing the loaded word list, feedback matrix and opening book with this one"""
+        game_solver = copy.copy(self)
+        game_solver.reset()
+        game_solver.random_gen = np.random.default_rng(seed=seed)
+        return game_solver
+        
+        
+    def _get_word_list(self):
+        return get_word_list(self.word_list_path, self.word_list_api).words
+
+
+    @property
+    def word_list(self) -> list[str]:
+        """The words still considered possible solutions"""
+        return self.engine.words_at(self.candidates)
 
 
     @staticmethod
@@ -80,90 +138,119 @@ class WordleSolver:
 
 
     @staticmethod
-    def _update_word_list(word_list: list[str], letter_dict: dict) -> list[str]:
+    def _update_word_list(word_list: list[str], letter_dict: dict, verbose=False) -> list[str]:
         """Removes invalid words based on the letter_dict"""
         
-        # Init a word list for filtering
-        filtered_word_list = deepcopy(word_list)
+        # Thin wrapper around the vectorized engine, keeping the list based API
+        mask = WordListEngine(word_list).filter_mask(letter_dict)
+        filtered_word_list = [word for word, keep in zip(word_list, mask) if keep]
         
-        for word in word_list:
-            
-            for green_letter, letter_idx in letter_dict["green"]:
-                # Remove word if it does not contain the green letter at the correct idx
-                if word[letter_idx] is not green_letter: 
-                    filtered_word_list.remove(word)
-                    break
-            
-            else: # Executes if the previous for loop didn't break
-                for yellow_letter, letter_idx in letter_dict["yellow"]:
-                    # Remove word if it contains a yellow letter in the idx known to not be correct or if the word doesn't contain the yellow letter
-                    if (word[letter_idx] is yellow_letter) or (yellow_letter not in word): 
-                        filtered_word_list.remove(word)
-                        break
-            
-                else:
-                    confirmed_letters = [l for l, _ in letter_dict["green"] + letter_dict["yellow"]]
-                    for gray_letter in letter_dict["gray"]:
-                        # Remove word only if it contains a gray letter and the gray letter does not appear in the green or yellow list (relates to words with multiple of the same char)
-                        # Kind of a shitty work around method since if the char is also added to the gray list, it is known how many of that specific char the target word contains.
-                        # This info is not utilized for the sorting, yet :)
-                        if (gray_letter in word) and (gray_letter not in confirmed_letters):
-                            filtered_word_list.remove(word)
-                            break
-        
-        print("Current filtered word list length:", len(filtered_word_list))
+        if verbose: print("Current filtered word list length:", len(filtered_word_list))
         
         return filtered_word_list
     
     
-    def _guess_word(self, guess: str):
+    def _get_feedback(self, guess: str, verbose=False) -> str:
+        """Obtains the feedback for a guess, here from the user playing the actual game"""
+        return input(f"Enter feedback for '{guess}' (e.g., '00120' for 'gray, gray, yellow, green, gray): ")
+    
+    
+    def _record_feedback(self, guess: str, feedback: str) -> list[int] | None:
+        """Records the feedback for a guess without narrowing the word list.
+        Returns None if it solved the puzzle, otherwise the letter codes it gave new information about."""
         
-        # Guess a word
-        print(f"WordleSolver guesses: '{guess}'...")
-        feedback = input(f"Enter feedback for '{guess}' (e.g., '00120' for 'gray, gray, yellow, green, gray): ")
         self.guesses_used += 1
+        metrics.inc("solver_guesses")
         
         # Check if feedback says it is solved
-        if feedback == "22222":
-            return True
+        if feedback == "2" * self.word_length:
+            return None
+        self.feedback_history.append(encode_feedback(feedback))
         
-        # Update the letter dict based on feedback
-        self.letter_dict = self._update_letter_dict(
-            letter_dict=self.letter_dict,
-            word=guess,
-            feedback=feedback,
-        )
+        # Merge the feedback into the constraints
+        return self.constraints.merge(word=guess, feedback=feedback)
+    
+    
+    def _apply_feedback(self, guess: str, feedback: str, verbose=False) -> bool:
+        """Records the feedback for a guess and narrows the word list, returns whether it solved the puzzle"""
         
-        # Update the word list based on letter dict
-        self.word_list = self._update_word_list(
-            word_list=self.word_list,
-            letter_dict=self.letter_dict,
-        )
+        touched_letters = self._record_feedback(guess=guess, feedback=feedback)
+        if touched_letters is None:
+            return True
+        
+        # Narrow the word list, using the feedback matrix when the guess is part of it
+        guess_idx = None if self.feedback_matrix is None else self.feedback_matrix.guess_index.get(guess)
+        if guess_idx is not None:
+            self.candidates = self.feedback_matrix.filter(
+                guess_idx=guess_idx,
+                candidates=self.candidates,
+                code=self.feedback_history[-1],
+            )
+        else:
+            self.candidates = self.constraints.narrow(
+                engine=self.engine,
+                candidates=self.candidates,
+                letter_codes=touched_letters,
+            )
+        if verbose: print("Current filtered word list length:", len(self.candidates))
         
         return False
+    
+    
+    def _guess_word(self, guess: str, verbose=False):
         
-      
-    def solve(self):
+        # Guess a word
+        if verbose: print(f"WordleSolver guesses: '{guess}'...")
+        feedback = self._get_feedback(guess=guess, verbose=verbose)
+        
+        return self._apply_feedback(guess=guess, feedback=feedback, verbose=verbose)
+    
+    
+    @metrics.timed("guess_selection")
+    def _next_guess(self) -> str:
+        """Chooses the next word to guess"""
+        
+        # Try out seed words first, in hard mode only while they use the revealed hints
+        guess = None
+        if self.guesses_used < len(self.seed_words):
+            guess = self.seed_words[self.guesses_used]
+        
+        # Follow the opening book while possible, otherwise let the guess strategy choose from the remaining word list
+        elif self.opening_book is not None:
+            guess = self.opening_book.lookup(self.feedback_history)
+        if guess is not None and not (self.hard_mode and self.constraints.hard_mode_violation(guess)):
+            return guess
         
-        # Try out seed words first
-        for seed_word in self.seed_words:
-            if self._guess_word(guess=seed_word): 
-                print(f"Wordle puzzle solved in {self.guesses_used} guesses!\nThe word was '{seed_word}'")
-                return True
+        return self.guess_strategy.choose(
+            candidates=self.candidates,
+            words=self.engine.words,
+            random_gen=self.random_gen,
+            feedback_matrix=self.feedback_matrix,
+            guesses=self.hard_mode_guesses() if self.hard_mode else None,
+            guesses_left=self.max_guesses - self.guesses_used,
+        )
+    
+    
+    def hard_mode_guesses(self) -> np.ndarray:
+        """Indices of the allowed guesses (rows of the feedback matrix) that reuse every revealed hint"""
+        return np.flatnonzero(self.constraints.hard_mode_mask(self.guess_engine.letters, self.guess_engine.letter_counts))
+        
+      
+    def solve(self, verbose=False):
         
-        # Choose random word from word list
         solved = False
         guess = ""
-        while (not solved) and (self.guesses_used < 6):
-            guess = self.word_list[self.random_gen.integers(low=0, high=len(self.word_list))]
-            solved = self._guess_word(guess=guess)
+        while (not solved) and (self.guesses_used < self.max_guesses):
+            guess = self._next_guess()
+            solved = self._guess_word(guess=guess, verbose=verbose)
         
         # Catch the result of the solving process
+        metrics.inc("solver_games", result="solved" if solved else "failed")
         if solved:
-            print(f"Wordle puzzle solved in {self.guesses_used} guesses!\nThe word was '{guess}'")
+            if verbose: print(f"Wordle puzzle solved in {self.guesses_used} guesses!\nThe word was '{guess}'")
             return True
         else:
-            print(f"WordleSolver ran out of guess ;(")
+            if verbose: print(f"WordleSolver ran out of guess ;(")
             return False
         
         
@@ -176,8 +263,9 @@ def main():
     ### When starting from scratch ###
     strat = int(input(f"Enter the number of seed words to use (0,1,2,3): "))
     solver = WordleSolver(seed_word_strategy=strat, seed=123)
+    print("Starting word list length", len(solver.word_list))
     
-    solver.solve()
+    solver.solve(verbose=True)
         
     
 
@@ -1,186 +1,177 @@
-import requests
-import json
+import asyncio
+import httpx
 import numpy as np
-from copy import deepcopy
+import requests
+import solver
 from pathlib import Path
+from candidate_bitsets import SolverStates, WordBitsets
+from feedback import decode_feedback, feedback_dtype, invalid_code
+from metrics import metrics
 
-class WordleSolver:
+
+class WordleSolver(solver.WordleSolver):
     def __init__(self,
                  seed_word_strategy: int = 1 ,
                  guessed_words: None | list[str] = None,
                  wordle_game_api: str = "http://127.0.0.1:8000/wordle",
-                 word_list_api: str = "https://cheaderthecoder.github.io/5-Letter-words/words.json",
+                 word_list_api: str | None = None,
                  seed=None,
+                 use_feedback_matrix: bool = True,
+                 guess_strategy: str = "random",
+                 opening_book: str | Path | None = None,
+                 **solver_kwargs,
                  ):
         
         # Init some class vars
         self.wordle_game_api = wordle_game_api
-        self.word_list_path = Path("word_lists/words.json")
-        self.word_list_api = word_list_api
-        self.guesses_used = 0
-        self.random_gen = np.random.default_rng(seed=seed)
-        
-        # Define the first tried out words
-        # https://www.sfi.ie/research-news/news/wordle-data-analytics/
-        if guessed_words is not None: self.seed_words = guessed_words                # If initialized with already guessed words
-        elif seed_word_strategy == 1: self.seed_words = ["tales",]                   # 95% success w/ 3.66 avg rounds 
-        elif seed_word_strategy == 2: self.seed_words = ["cones", "trial",]          # 96% success w/ 3.68 avg rounds 
-        elif seed_word_strategy == 3: self.seed_words = ["hates", "round", "climb",] # 97% success w/ 4.20 avg rounds 
-        else: 
-            print("Using no seed words")
-            self.seed_words = []
-        
-        # Init letter dict, recording the knowledge gained from guessing
-        self.letter_dict = {
-            "gray": [],
-            "yellow": [],
-            "green": [],
-        }
-        
-        # Obtain a word list of all english 5 letter words
-        self.word_list = self._get_word_list()
         
+        super().__init__(
+            seed_word_strategy=seed_word_strategy,
+            guessed_words=guessed_words,
+            word_list_api=word_list_api,
+            seed=seed,
+            use_feedback_matrix=use_feedback_matrix,
+            guess_strategy=guess_strategy,
+            opening_book=opening_book,
+            **solver_kwargs,
+        )
     
-    def reset(self):
-        self.guesses_used = 0
-        self.word_list = self._get_word_list()
-        self.letter_dict = {
-            "gray": [],
-            "yellow": [],
-            "green": [],
-        }
-        return True
-        
-        
-    def _get_word_list(self):
-        
-        if self.word_list_path.exists():
-            with open(self.word_list_path, 'r') as file:
-                word_list = json.load(file)["words"]
+    
+    def _get_feedback(self, guess: str, verbose=False) -> str:
+        """Obtains the feedback for a guess from the wordle game api"""
         
+        with metrics.timer("feedback_request"):
+            response = requests.post(url=self.wordle_game_api, json={"guess": guess})
+        if response.status_code == 200:
+            feedback = response.json()["feedback"]
+            if verbose: 
+                print(f"Received guess feedback: {feedback}")
+                summary = response.json()["game_summary"]
+                if summary is not None:
+                    print(summary)
         else:
-            response = requests.get(self.word_list_api)
-            if response.status_code == 200:
-                print("Fetched word list from API")
-                word_list_json = response.json()
-                
-                with open(self.word_list_path, "w") as file:
-                    json.dump(word_list_json, file, indent=4)
-                word_list = word_list_json["words"]
-            else:
-                raise ValueError("Failed to fetch word list")
-        
-        return word_list
+            raise ValueError("Failed to fetch feedback from wordle game api...")
+        
+        return feedback
 
 
-    @staticmethod
-    def _update_letter_dict(letter_dict: dict, word: str, feedback: str) -> dict:
-        """Updates the letter dict based on a tested word and the received feedback"""
-        # feedback -> '00120' -> gray, gray, yellow, green, gray
-        
-        assert len(word) == len(feedback), "The feedback must be same length as the word (5)"
-        
-        for i, (letter, result) in enumerate(zip(word, feedback)):
+
+def solve_many(num_games: int,
+               wordle_games_api: str = "http://127.0.0.1:8000/games",
+               batch_size: int = 1000,
+               seed=None,
+               **solver_kwargs,
+               ) -> list[int]:
+    """Solves num_games session games of the wordle game api, advancing a whole batch of games per request.
+    Returns the guesses used per game, 0 if it was not solved."""
+    
+    # Games share the loaded word list and feedback matrix, only the per game state is copied
+    template = WordleSolver(seed=seed, **solver_kwargs)
+    dtype, invalid = feedback_dtype(template.word_length), invalid_code(template.word_length)
+    states = SolverStates(WordBitsets(template.engine), min(batch_size, num_games))
+    results = []
+    
+    for batch_start in range(0, num_games, batch_size):
+        n_batch = min(batch_size, num_games - batch_start)
+        response = requests.post(url=f"{wordle_games_api}/batch", params={"word_length": template.word_length}, json={"count": n_batch})
+        if response.status_code != 200:
+            raise ValueError("Failed to create games at the wordle game api...")
+        session_ids = response.json()["session_ids"]
+        
+        solvers = [
+            template.spawn(seed=None if seed is None else [seed, game_index])
+            for game_index in range(batch_start, batch_start + n_batch)
+        ]
+        
+        # The candidates of the whole batch live in one bitset array, narrowed for every game at once per round
+        states.reset()
+        
+        # Every round guesses once in each unfinished game
+        guesses_used = [0] * n_batch
+        active = list(range(n_batch))
+        while active:
+            guesses = []
+            for i in active:
+                solvers[i].candidates = states.candidates(i)
+                guesses.append(solvers[i]._next_guess())
+            response = requests.post(
+                url=f"{wordle_games_api}/batch/guess",
+                params={"format": "binary", "word_length": template.word_length},
+                json={"session_ids": [session_ids[i] for i in active], "guesses": guesses},
+            )
+            if response.status_code != 200:
+                raise ValueError("Failed to fetch feedback from wordle game api...")
+            codes = np.frombuffer(response.content, dtype=dtype, count=len(active))
+            if (codes == invalid).any():
+                raise ValueError(f"The wordle game api rejected the guess '{guesses[int(np.argmax(codes == invalid))]}'")
+            states.apply(np.array(active), guesses, codes)
             
-            match result:
-                case "0": letter_dict["gray"].append(letter)
-                case "1": letter_dict["yellow"].append([letter, i])
-                case "2": letter_dict["green"].append([letter, i])
-                case _: raise Exception(f"The feedback had an unknown charactor: {result}")
-        
-        return letter_dict
+            still_active = []
+            for i, guess, code in zip(active, guesses, codes):
+                if solvers[i]._record_feedback(guess=guess, feedback=decode_feedback(code, len(guess))) is None:
+                    guesses_used[i] = solvers[i].guesses_used
+                elif solvers[i].guesses_used < template.max_guesses:
+                    still_active.append(i)
+            active = still_active
+        
+        results.extend(guesses_used)
+    
+    return results
+
 
 
-    @staticmethod
-    def _update_word_list(word_list: list[str], letter_dict: dict, verbose=False) -> list[str]:
-        """Removes invalid words based on the letter_dict"""
+class AsyncWordleSolver(WordleSolver):
+    """WordleSolver playing its own session game of the wordle game api over a shared, pooled async http client"""
+    
+    def __init__(self,
+                 wordle_games_api: str = "http://127.0.0.1:8000/games",
+                 client: httpx.AsyncClient | None = None,
+                 **solver_kwargs,
+                 ):
         
-        # Init a word list for filtering
-        filtered_word_list = deepcopy(word_list)
+        self.wordle_games_api = wordle_games_api
+        self.client = client
+        self.session_id = None
         
-        for word in word_list:
-            
-            for green_letter, letter_idx in letter_dict["green"]:
-                # Remove word if it does not contain the green letter at the correct idx
-                if word[letter_idx] is not green_letter: 
-                    filtered_word_list.remove(word)
-                    break
-            
-            else: # Executes if the previous for loop didn't break
-                for yellow_letter, letter_idx in letter_dict["yellow"]:
-                    # Remove word if it contains a yellow letter in the idx known to not be correct or if the word doesn't contain the yellow letter
-                    if (word[letter_idx] is yellow_letter) or (yellow_letter not in word): 
-                        filtered_word_list.remove(word)
-                        break
-            
-                else:
-                    confirmed_letters = [l for l, _ in letter_dict["green"] + letter_dict["yellow"]]
-                    for gray_letter in letter_dict["gray"]:
-                        # Remove word only if it contains a gray letter and the gray letter does not appear in the green or yellow list (relates to words with multiple of the same char)
-                        # Kind of a shitty work around method since if the char is also added to the gray list, it is known how many of that specific char the target word contains.
-                        # This info is not utilized for the sorting, yet :)
-                        if (gray_letter in word) and (gray_letter not in confirmed_letters):
-                            filtered_word_list.remove(word)
-                            break
-        
-        if verbose: print("Current filtered word list length:", len(filtered_word_list))
-        
-        return filtered_word_list
+        super().__init__(**solver_kwargs)
     
     
-    def _guess_word(self, guess: str, verbose=False):
+    async def _get_feedback_async(self, guess: str, verbose=False) -> str:
+        """Obtains the feedback for a guess from the session game of the wordle game api"""
         
-        # Guess a word
-        if verbose: print(f"WordleSolver guesses: '{guess}'...")
-        response = requests.post(url=self.wordle_game_api, json={"guess": guess})
+        with metrics.timer("feedback_request"):
+            response = await self.client.post(f"{self.wordle_games_api}/{self.session_id}/guess", json={"guess": guess})
         if response.status_code == 200:
             feedback = response.json()["feedback"]
-            if verbose: 
-                print(f"Received guess feedback: {feedback}")
-                summary = response.json()["game_summary"]
-                if summary is not None:
-                    print(summary)
+            if verbose: print(f"Received guess feedback: {feedback}")
         else:
             raise ValueError("Failed to fetch feedback from wordle game api...")
         
-        self.guesses_used += 1
-        
-        # Check if feedback says it is solved
-        if feedback == "22222":
-            return True
-        
-        # Update the letter dict based on feedback
-        self.letter_dict = self._update_letter_dict(
-            letter_dict=self.letter_dict,
-            word=guess,
-            feedback=feedback,
-        )
-        
-        # Update the word list based on letter dict
-        self.word_list = self._update_word_list(
-            word_list=self.word_list,
-            letter_dict=self.letter_dict,
-        )
-        
-        return False
-        
-      
-    def solve(self, verbose=False):
-        
-        # Try out seed words first
-        for seed_word in self.seed_words:
-            if self._guess_word(guess=seed_word): 
-                if verbose: print(f"Wordle puzzle solved in {self.guesses_used} guesses!\nThe word was '{seed_word}'")
-                return True
-        
-        # Choose random word from word list
-        solved = False
-        guess = ""
-        while (not solved) and (self.guesses_used < 6):
-            guess = self.word_list[self.random_gen.integers(low=0, high=len(self.word_list))]
-            solved = self._guess_word(guess=guess)
+        return feedback
+    
+    
+    async def solve(self, verbose=False):
+        
+        # Start a session game, which is ended again once solved or out of guesses
+        response = await self.client.post(self.wordle_games_api, params={"word_length": self.word_length})
+        if response.status_code != 200:
+            raise ValueError("Failed to create a game at the wordle game api...")
+        self.session_id = response.json()["session_id"]
+        
+        try:
+            solved = False
+            guess = ""
+            while (not solved) and (self.guesses_used < self.max_guesses):
+                guess = self._next_guess()
+                if verbose: print(f"WordleSolver guesses: '{guess}'...")
+                feedback = await self._get_feedback_async(guess=guess, verbose=verbose)
+                solved = self._apply_feedback(guess=guess, feedback=feedback, verbose=verbose)
+        finally:
+            await self.client.delete(f"{self.wordle_games_api}/{self.session_id}")
+            self.session_id = None
         
         # Catch the result of the solving process
+        metrics.inc("solver_games", result="solved" if solved else "failed")
         if solved:
             if verbose: print(f"Wordle puzzle solved in {self.guesses_used} guesses!\nThe word was '{guess}'")
             return True
@@ -188,6 +179,31 @@ class WordleSolver:
             if verbose: print(f"WordleSolver ran out of guess ;(")
             return False
 
+
+
+async def solve_concurrently(num_games: int,
+                             concurrency: int = 64,
+                             wordle_games_api: str = "http://127.0.0.1:8000/games",
+                             seed=None,
+                             **solver_kwargs,
+                             ) -> list[int]:
+    """Solves num_games session games, with at most concurrency games in flight over one keep-alive connection pool.
+    Returns the guesses used per game, 0 if it was not solved."""
+    
+    template = AsyncWordleSolver(wordle_games_api=wordle_games_api, seed=seed, **solver_kwargs)
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    
+    async with httpx.AsyncClient(limits=limits) as client:
+        
+        async def play(game_index: int) -> int:
+            async with semaphore:
+                game_solver = template.spawn(seed=None if seed is None else [seed, game_index])
+                game_solver.client = client
+                return game_solver.guesses_used if await game_solver.solve() else 0
+        
+        return await asyncio.gather(*(play(game_index) for game_index in range(num_games)))
+        
         
         
         
@@ -208,4 +224,4 @@ def main():
     
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,139 @@
+from contextlib import asynccontextmanager
+from functools import lru_cache
+
+import numpy as np
+from fastapi import APIRouter, FastAPI, HTTPException
+from pydantic import BaseModel
+
+from feedback import decode_feedback, encode_feedback
+from metrics import metrics
+from solver import WordleSolver
+from strategies import STRATEGIES, ScoredStrategy
+from word_list import DEFAULT_WORD_LENGTH
+
+# Solved states kept in memory, most openings repeat so a small cache serves the bulk of the requests
+CACHE_SIZE = 4096
+
+# Most ranked guesses returned per request
+MAX_TOP = 100
+
+
+# Create models for the next guess messages
+class SolverTurn(BaseModel):
+    guess: str
+    feedback: str
+
+class SolverRequest(BaseModel):
+    history: list[SolverTurn] = []
+    word_length: int = DEFAULT_WORD_LENGTH
+    strategy: str = "entropy"
+    hard_mode: bool = False
+    top: int = 10
+
+
+# Warm solvers per (word_length, strategy), sharing the word lists and feedback matrices of their length
+_solvers: dict[tuple[int, str], WordleSolver] = {}
+
+
+def get_solver(word_length: int = DEFAULT_WORD_LENGTH, strategy: str = "entropy") -> WordleSolver:
+    """The warm solver of a configuration, loaded on first use"""
+    key = (word_length, strategy)
+    if key not in _solvers:
+        _solvers[key] = WordleSolver(seed_word_strategy=0, guessed_words=[], guess_strategy=strategy, word_length=word_length)
+    return _solvers[key]
+
+
+def canonical_history(history: list[tuple[str, str]], word_length: int) -> tuple[tuple[str, int], ...]:
+    """Validated and sorted (guess, feedback code) pairs, so equivalent requests share a cache entry.
+    The candidates and the hard mode guesses do not depend on the order of the turns."""
+    turns = []
+    for guess, feedback in history:
+        guess = guess.lower()
+        if len(guess) != word_length or len(feedback) != word_length:
+            raise ValueError(f"Guesses and feedback must be exactly {word_length} letters!")
+        if not (guess.isascii() and guess.isalpha()):
+            raise ValueError("Guesses may only contain the letters a-z")
+        turns.append((guess, encode_feedback(feedback)))
+    return tuple(sorted(turns))
+
+
+def next_guesses(word_length: int, strategy: str, hard_mode: bool, history: tuple[tuple[str, int], ...], top: int) -> dict:
+    """The top next guesses for a canonical feedback history"""
+    ranking = ranked_guesses(word_length, strategy, hard_mode, history)
+    return ranking | {"guesses": ranking["guesses"][:top]}
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def ranked_guesses(word_length: int, strategy: str, hard_mode: bool, history: tuple[tuple[str, int], ...]) -> dict:
+    """Ranks the best MAX_TOP next guesses for a canonical feedback history, replaying it on a fresh game of the warm solver"""
+
+    base = get_solver(word_length, strategy)
+    game = base.spawn()
+    game.hard_mode = hard_mode
+    for guess, code in history:
+        if game._apply_feedback(guess=guess, feedback=decode_feedback(code, word_length)):
+            return {"solved": True, "candidates": 1, "guesses": [{"guess": guess, "score": None, "is_candidate": True}]}
+
+    candidates = game.candidates
+    if len(candidates) == 0:
+        raise ValueError("No word matches the feedback history")
+
+    # With one or two candidates left, guessing one of them is always at least as good
+    feedback_matrix = game.feedback_matrix
+    if len(candidates) <= 2:
+        ranked = [(feedback_matrix.answer_words[idx], None, True) for idx in candidates]
+    else:
+        guesses = game.hard_mode_guesses() if hard_mode else None
+        order = game.guess_strategy.rank(feedback_matrix, candidates, guesses)[:MAX_TOP]
+        scores = game.guess_strategy.score(feedback_matrix, candidates, order)
+        is_candidate = np.isin(order, feedback_matrix.answer_guess_idx[candidates])
+        ranked = [(feedback_matrix.guess_words[idx], float(score), bool(candidate))
+                  for idx, score, candidate in zip(order, scores, is_candidate)]
+
+    return {
+        "solved": False,
+        "candidates": int(len(candidates)),
+        "guesses": [{"guess": guess, "score": score, "is_candidate": candidate} for guess, score, candidate in ranked],
+    }
+
+
+router = APIRouter()
+
+# Create next guess endpoint, ranking the best guesses for a guess/feedback history.
+# Scoring takes a while on a cache miss, so it runs in the threadpool instead of blocking the event loop.
+@router.post("/solver/next")
+def solver_next(request: SolverRequest):
+
+    strategy = STRATEGIES.get(request.strategy)
+    if strategy is None or not issubclass(strategy, ScoredStrategy):
+        scored = [name for name, cls in STRATEGIES.items() if issubclass(cls, ScoredStrategy)]
+        raise HTTPException(status_code=400, detail=f"Strategy must be one of {scored}")
+    if not 0 < request.top <= MAX_TOP:
+        raise HTTPException(status_code=400, detail=f"Top must be between 1 and {MAX_TOP}")
+
+    try:
+        history = canonical_history([(turn.guess, turn.feedback) for turn in request.history], request.word_length)
+        hits = ranked_guesses.cache_info().hits
+        response = next_guesses(request.word_length, request.strategy, request.hard_mode, history, request.top)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"No word list for {request.word_length} letter words")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    metrics.inc("solver_service_requests", cache="hit" if ranked_guesses.cache_info().hits > hits else "miss")
+    return response
+
+# Create solver cache endpoint
+@router.get("/solver/cache")
+async def solver_cache():
+    return ranked_guesses.cache_info()._asdict()
+
+
+# Standalone app, also served by wordle_api alongside the games
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    get_solver()
+    yield
+
+app = FastAPI(lifespan=lifespan)
+app.include_router(router)
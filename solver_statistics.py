@@ -1,9 +1,14 @@
-from solver_api import WordleSolver
+from simulation import simulate
+from strategies import STRATEGIES
 from tqdm import tqdm
 
 def main():
+    # The http client is only loaded when playing against the wordle game api
+    from solver_api import WordleSolver
+    
     strat = int(input(f"Enter the number of seed words to use (0,1,2,3): "))
-    solver = WordleSolver(seed_word_strategy=strat, seed=42)
+    guess_strategy = input(f"Enter the guess strategy to use {list(STRATEGIES)}: ")
+    solver = WordleSolver(seed_word_strategy=strat, seed=42, guess_strategy=guess_strategy)
     
     num_runs = int(input(f"Enter the number of runs to do: "))
     
@@ -15,34 +20,54 @@ def main():
             solves_guesses += solver.guesses_used
         solver.reset()
     
-    print(f"Solving success with {strat} seed words for {num_runs} runs:")
+    print(f"Solving success with {strat} seed words and '{guess_strategy}' guesses for {num_runs} runs:")
     print(f"   {(n_solves/num_runs)*100:3f}%")
     print(f"Avg. guesses for solves")
     print(f"   {solves_guesses/n_solves:3f}")
 
 
-def test_solver(num_runs: int = 10_000):
+def test_solver(num_runs: int = 10_000, guess_strategies: list[str] = list(STRATEGIES)):
+    from solver_api import WordleSolver
     
-    for strat in range(4):
-        print(f"Testing using {strat} seed words...")
-        solver = WordleSolver(seed_word_strategy=strat, seed=42)
-        
-        n_solves = 0
-        solves_guesses = 0
-        for _ in tqdm(range(num_runs)):
-            if solver.solve(): 
-                n_solves += 1
-                solves_guesses += solver.guesses_used
-            solver.reset()
-        
-        print(f"Solving success with {strat} seed words for {num_runs} runs:")
-        print(f"   {(n_solves/num_runs)*100:3f}%")
-        print(f"Avg. guesses for solves")
-        print(f"   {solves_guesses/n_solves:3f}")
+    for guess_strategy in guess_strategies:
+        for strat in range(4):
+            print(f"Testing using {strat} seed words and '{guess_strategy}' guesses...")
+            solver = WordleSolver(seed_word_strategy=strat, seed=42, guess_strategy=guess_strategy)
+            
+            n_solves = 0
+            solves_guesses = 0
+            for _ in tqdm(range(num_runs)):
+                if solver.solve(): 
+                    n_solves += 1
+                    solves_guesses += solver.guesses_used
+                solver.reset()
+            
+            print(f"Solving success with {strat} seed words and '{guess_strategy}' guesses for {num_runs} runs:")
+            print(f"   {(n_solves/num_runs)*100:3f}%")
+            print(f"Avg. guesses for solves")
+            print(f"   {solves_guesses/n_solves:3f}")
+
+
+
+def simulate_solver(num_games: int | None = None, guess_strategies: list[str] = list(STRATEGIES), workers: int | None = None):
+    """Like test_solver, but plays in-process against every word (or num_games sampled words) without the wordle game api"""
     
+    for guess_strategy in guess_strategies:
+        for strat in range(4):
+            result = simulate(guess_strategy=guess_strategy, seed_word_strategy=strat, num_games=num_games, seed=42, workers=workers)
+            
+            print(f"Solving success with {strat} seed words and '{guess_strategy}' guesses for {result['games']} games:")
+            print(f"   {result['success_rate']*100:3f}%")
+            print(f"Avg. guesses for solves")
+            print(f"   {result['avg_guesses']:3f}")
+            print(f"Guess histogram")
+            print(f"   {result['guess_histogram']}")
+            print(f"Wall time")
+            print(f"   {result['wall_time']:3f}s")
 
 
 
 if __name__ == "__main__":
     #main()
-    test_solver(1000)
\ No newline at end of file
+    #test_solver(1000)
+    simulate_solver()
@@ -0,0 +1,306 @@
+import time
+from typing import Callable
+
+import numpy as np
+
+from feedback import FeedbackMatrix
+from metrics import metrics
+
+# Max number of (guess, candidate) feedback codes histogrammed at once
+SCORE_BATCH_SIZE = 1 << 22
+
+# Solved sub-problems kept by the minimax search before its transposition table is cleared
+TRANSPOSITION_TABLE_SIZE = 1_000_000
+
+
+def histogram_rows(codes: np.ndarray, n_patterns: int) -> np.ndarray:
+    """Counts the feedback codes of each row -> (R, n_patterns)"""
+    # Offset each row into its own block of bins, so one bincount histograms the whole batch
+    offsets = (np.arange(codes.shape[0]) * n_patterns)[:, None]
+    counts = np.bincount((codes + offsets).ravel(), minlength=codes.shape[0] * n_patterns)
+    return counts.reshape(codes.shape[0], n_patterns)
+
+
+def reduce_pattern_histograms(feedback_matrix: FeedbackMatrix,
+                              candidates: np.ndarray,
+                              guesses: np.ndarray | None,
+                              reduce: Callable[[np.ndarray], np.ndarray],
+                              ) -> np.ndarray:
+    """Counts, for every guess, how the candidates are distributed over the feedback patterns and reduces each batch of
+    (R, 3**word_length) histograms to per guess values with reduce, so the full (G, 3**word_length) matrix never exists"""
+
+    n_guesses = feedback_matrix.matrix.shape[0] if guesses is None else len(guesses)
+    n_patterns = 3 ** feedback_matrix.word_length
+    batch = max(1, SCORE_BATCH_SIZE // max(len(candidates), n_patterns))
+
+    results = []
+    for start in range(0, n_guesses, batch):
+        # Row slices are views, so only the candidate columns get copied
+        if guesses is None:
+            codes = feedback_matrix.matrix[start:start + batch][:, candidates]
+        else:
+            codes = feedback_matrix.matrix[np.ix_(guesses[start:start + batch], candidates)]
+        results.append(reduce(histogram_rows(codes, n_patterns)))
+
+    return np.concatenate(results) if results else np.empty(0)
+
+
+class GuessStrategy:
+    """Picks the next guess given the remaining candidate answers"""
+
+    name = ""
+    requires_feedback_matrix = False
+
+    def choose(self,
+               candidates: np.ndarray,
+               words: list[str],
+               random_gen: np.random.Generator,
+               feedback_matrix: FeedbackMatrix | None = None,
+               guesses: np.ndarray | None = None,
+               guesses_left: int | None = None,
+               ) -> str:
+        """guesses optionally restricts the guess words (rows of the feedback matrix) that may be played, e.g. in hard mode.
+        guesses_left is the number of guesses remaining in the game, including this one."""
+        raise NotImplementedError
+
+
+class RandomStrategy(GuessStrategy):
+    """Guesses a uniformly random remaining candidate"""
+
+    name = "random"
+
+    def choose(self, candidates, words, random_gen, feedback_matrix=None, guesses=None, guesses_left=None):
+        # The candidates are consistent with every hint, so they are always allowed guesses
+        return words[candidates[random_gen.integers(low=0, high=len(candidates))]]
+
+
+class ScoredStrategy(GuessStrategy):
+    """Guesses the word with the best score over the feedback pattern distribution of the candidates"""
+
+    requires_feedback_matrix = True
+
+    def score_histograms(self, histograms: np.ndarray, n_candidates: int) -> np.ndarray:
+        """Scores each guess from its pattern histogram, higher is better"""
+        raise NotImplementedError
+
+
+    def score(self, feedback_matrix: FeedbackMatrix, candidates: np.ndarray, guesses: np.ndarray | None = None) -> np.ndarray:
+        """Scores every guess in the feedback matrix (or only the given guesses) against the candidates"""
+        return reduce_pattern_histograms(feedback_matrix, candidates, guesses,
+                                         lambda histograms: self.score_histograms(histograms, len(candidates)))
+
+
+    def rank(self, feedback_matrix: FeedbackMatrix, candidates: np.ndarray, guesses: np.ndarray | None = None) -> np.ndarray:
+        """Guess indices ordered from best to worst, preferring guesses that could still be the answer on ties"""
+        scores = self.score(feedback_matrix, candidates, guesses)
+        is_candidate = np.zeros(feedback_matrix.matrix.shape[0], dtype=bool)
+        candidate_guesses = feedback_matrix.answer_guess_idx[candidates]
+        is_candidate[candidate_guesses[candidate_guesses >= 0]] = True
+        if guesses is None:
+            return np.lexsort((~is_candidate, -scores))
+        return guesses[np.lexsort((~is_candidate[guesses], -scores))]
+
+
+    def choose(self, candidates, words, random_gen, feedback_matrix=None, guesses=None, guesses_left=None):
+        if feedback_matrix is None:
+            raise ValueError(f"The '{self.name}' strategy requires the feedback matrix")
+
+        # With one or two candidates left, guessing one of them is always at least as good
+        if len(candidates) <= 2:
+            return feedback_matrix.answer_words[candidates[0]]
+
+        return feedback_matrix.guess_words[self.rank(feedback_matrix, candidates, guesses)[0]]
+
+
+class EntropyStrategy(ScoredStrategy):
+    """Maximizes the expected information (in bits) gained from the feedback"""
+
+    name = "entropy"
+
+    def score_histograms(self, histograms, n_candidates):
+        counts = histograms.astype(np.float64)
+        log_counts = np.log2(counts, out=np.zeros_like(counts), where=counts > 0)
+        return np.log2(n_candidates) - (counts * log_counts).sum(axis=1) / n_candidates
+
+
+class ExpectedSizeStrategy(ScoredStrategy):
+    """Minimizes the expected number of candidates remaining after the feedback"""
+
+    name = "expected_size"
+
+    def score_histograms(self, histograms, n_candidates):
+        counts = histograms.astype(np.float64)
+        return -(counts ** 2).sum(axis=1) / n_candidates
+
+
+class SearchTimeout(Exception):
+    """Raised inside the minimax search when its time budget runs out"""
+
+
+class MinimaxStrategy(GuessStrategy):
+    """Minimizes the worst case number of guesses, searching the best beam_width guesses of every candidate set down to the
+    remaining guesses (or max_depth). Guesses that cannot beat the best one found so far are cut off, and solved candidate
+    sets are kept in a transposition table keyed on their bitmask, so sets reached along different paths are searched once.
+    When the time budget runs out or no guess guarantees a solve, it falls back to the best guess found or the fallback strategy."""
+
+    name = "minimax"
+    requires_feedback_matrix = True
+
+    def __init__(self,
+                 beam_width: int = 8,
+                 max_depth: int | None = None,
+                 time_budget: float = 5.0,
+                 fallback: str = "entropy",
+                 ) -> None:
+        self.beam_width = beam_width
+        self.max_depth = max_depth
+        self.time_budget = time_budget
+        self.fallback = get_strategy(fallback)
+
+        # (restricted, candidate bitmask) -> (worst case guesses, exact, guess index), exact False meaning a lower bound
+        self.table: dict[tuple[bool, bytes], tuple[int, bool, int]] = {}
+        self._feedback_matrix = None
+        self._deadline = float("inf")
+        self.best_guess = -1
+
+
+    def _key(self, candidates: np.ndarray, restricted: bool) -> tuple[bool, bytes]:
+        mask = np.zeros(self._feedback_matrix.matrix.shape[1], dtype=bool)
+        mask[candidates] = True
+        return restricted, np.packbits(mask).tobytes()
+
+
+    def _beam(self, candidates: np.ndarray, guesses: np.ndarray | None) -> tuple[np.ndarray, np.ndarray]:
+        """The guesses worth searching, ordered by their largest and then expected partition, and each guess' largest partition"""
+        feedback_matrix = self._feedback_matrix
+
+        def worst_and_expected(histograms: np.ndarray) -> np.ndarray:
+            # Guessing the answer ends the game, so the all green pattern never needs another guess
+            histograms[:, -1] = 0
+            return np.stack([histograms.max(axis=1), (histograms ** 2).sum(axis=1)], axis=1)
+
+        stats = reduce_pattern_histograms(feedback_matrix, candidates, guesses, worst_and_expected).reshape(-1, 2)
+        worst, expected = stats[:, 0], stats[:, 1]
+
+        rows = np.arange(len(stats)) if guesses is None else guesses
+        is_candidate = np.isin(rows, feedback_matrix.answer_guess_idx[candidates])
+        order = np.lexsort((~is_candidate, expected, worst))
+        # Guesses that split nothing and cannot be the answer never help
+        order = order[(worst[order] < len(candidates)) | is_candidate[order]]
+        return rows[order], worst[order]
+
+
+    def _search(self, candidates: np.ndarray, limit: int, guesses: np.ndarray | None = None, restricted: bool = False,
+                root: bool = False) -> tuple[int, int]:
+        """Fewest guesses that solve every candidate in the worst case, with the guess achieving it.
+        Only values below limit are exact, otherwise a lower bound >= limit is returned with guess -1.
+        restricted limits the guesses to the candidates (hard mode), or to the given guesses at the root."""
+
+        feedback_matrix = self._feedback_matrix
+        if len(candidates) == 1:
+            return 1, int(feedback_matrix.answer_guess_idx[candidates[0]])
+        if limit <= 2:
+            return 2, -1
+
+        key = self._key(candidates, restricted) if guesses is None else None
+        if key is not None and key in self.table:
+            value, exact, guess = self.table[key]
+            if exact or value >= limit:
+                if root and value < limit: self.best_guess = guess
+                return value, guess
+        if time.perf_counter() > self._deadline:
+            raise SearchTimeout()
+
+        if restricted and guesses is None:
+            guesses = feedback_matrix.answer_guess_idx[candidates]
+            guesses = guesses[guesses >= 0]
+        rows, worst = self._beam(candidates, guesses)
+
+        # A guess splitting the candidates into single words always solves in two, otherwise two guesses are impossible
+        best, best_guess = limit, -1
+        if len(rows) and worst[0] <= 1:
+            best, best_guess = 2, int(rows[0])
+        elif limit <= 3:
+            best = 3
+
+        n_patterns = 3 ** feedback_matrix.word_length
+        for guess in rows[:self.beam_width] if best_guess < 0 and best > 3 else ():
+            codes = feedback_matrix.matrix[guess, candidates]
+            counts = np.bincount(codes, minlength=n_patterns)
+            ends = np.cumsum(counts)
+            order = np.argsort(codes, kind="stable")
+            counts[-1] = 0
+
+            # Search the largest partitions first, they decide the worst case and cut off bad guesses soonest
+            cost = 2
+            for code in np.argsort(-counts, kind="stable")[:np.count_nonzero(counts)]:
+                part = candidates[order[ends[code] - counts[code]:ends[code]]]
+                sub_cost, _ = self._search(part, best - 1, restricted=restricted)
+                cost = max(cost, 1 + sub_cost)
+                if cost >= best:
+                    break
+            if cost < best:
+                best, best_guess = cost, int(guess)
+                if root: self.best_guess = best_guess
+                # No guess can do better than three once two are ruled out
+                if best <= 3:
+                    break
+
+        if key is not None:
+            if len(self.table) >= TRANSPOSITION_TABLE_SIZE:
+                self.table.clear()
+            self.table[key] = (best, best_guess >= 0, best_guess)
+        if root and best_guess >= 0: self.best_guess = best_guess
+        return best, best_guess
+
+
+    def choose(self, candidates, words, random_gen, feedback_matrix=None, guesses=None, guesses_left=None):
+        if feedback_matrix is None:
+            raise ValueError(f"The '{self.name}' strategy requires the feedback matrix")
+        if len(candidates) <= 2:
+            return feedback_matrix.answer_words[candidates[0]]
+
+        # The table only holds for the feedback matrix it was filled with
+        if feedback_matrix is not self._feedback_matrix:
+            self._feedback_matrix = feedback_matrix
+            self.table.clear()
+
+        depth = guesses_left if guesses_left is not None else 6
+        if self.max_depth is not None:
+            depth = min(depth, self.max_depth)
+        self._deadline = time.perf_counter() + self.time_budget
+
+        # In hard mode every later guess must reuse the hints, which the remaining candidates always do
+        self.best_guess = -1
+        timed_out = False
+        try:
+            self._search(candidates, depth + 1, guesses, restricted=guesses is not None, root=True)
+            metrics.inc("minimax_searches", result="solved" if self.best_guess >= 0 else "unsolvable")
+        except SearchTimeout:
+            timed_out = True
+            metrics.inc("minimax_searches", result="timeout")
+
+        # Out of time, the best fully searched guess still bounds the worst case
+        if self.best_guess >= 0:
+            return feedback_matrix.guess_words[self.best_guess]
+
+        # On the last guess, or when a search over every remaining guess found no line that always wins,
+        # only a word that could be the answer can still win
+        last_guess = guesses_left is not None and guesses_left <= 1
+        exhaustive = self.max_depth is None or (guesses_left is not None and self.max_depth >= guesses_left)
+        if last_guess or (exhaustive and not timed_out):
+            candidate_guesses = feedback_matrix.answer_guess_idx[candidates]
+            candidate_guesses = candidate_guesses[candidate_guesses >= 0]
+            if len(candidate_guesses) == 0:
+                return feedback_matrix.answer_words[candidates[0]]
+            guesses = candidate_guesses
+        return self.fallback.choose(candidates, words, random_gen, feedback_matrix, guesses, guesses_left)
+
+
+STRATEGIES = {strategy.name: strategy for strategy in (RandomStrategy, EntropyStrategy, ExpectedSizeStrategy, MinimaxStrategy)}
+
+
+def get_strategy(name: str) -> GuessStrategy:
+    if name not in STRATEGIES:
+        raise ValueError(f"Unknown guess strategy '{name}', choose from {list(STRATEGIES)}")
+    return STRATEGIES[name]()
@@ -0,0 +1,88 @@
+import argparse
+import json
+import os
+from pathlib import Path
+
+
+def read_words(source: str) -> list[str]:
+    """Reads a word list from a url or a local file, either json ({"words": [...]} or a plain list) or one word per line"""
+
+    if source.startswith(("http://", "https://")):
+        import requests
+        response = requests.get(source)
+        if response.status_code != 200:
+            raise ValueError(f"Failed to fetch word list from '{source}'")
+        text = response.text
+    else:
+        text = Path(source).read_text()
+
+    try:
+        data = json.loads(text)
+        words = data["words"] if isinstance(data, dict) else data
+    except json.JSONDecodeError:
+        words = text.split()
+
+    return sorted({word.strip().lower() for word in words if word.strip()})
+
+
+def import_word_list(words: list[str], json_path: Path, verbose: bool = False) -> Path:
+    """Saves a word list as json in the data directory and converts it into its memory-mappable binary file"""
+
+    from word_list import convert_word_list
+
+    json_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = json_path.with_name(f"{json_path.stem}.{os.getpid()}.tmp.json")
+    with open(tmp_path, "w") as file:
+        json.dump({"words": words}, file, indent=4)
+    os.replace(tmp_path, json_path)
+
+    binary_path = json_path.with_suffix(".npy")
+    convert_word_list(words, binary_path)
+    if verbose: print(f"Imported {len(words)} words to '{json_path}' and '{binary_path}'")
+    return binary_path
+
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Import word lists into the data directory once, so the solver and the api start without network access"
+    )
+    parser.add_argument("--source", default=None,
+                        help="Word list file or url, defaults to the known word list api for 5 letter words")
+    parser.add_argument("--answers", default=None,
+                        help="Optional separate answer list file or url, saved as answers[_<length>].json")
+    parser.add_argument("--word-length", type=int, default=5)
+    parser.add_argument("--data-dir", type=Path, default=None, help="Defaults to WORDLE_DATA_DIR or the package's word_lists")
+    parser.add_argument("--no-feedback-matrix", action="store_true", help="Skip precomputing the feedback matrix")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    # Point the data directory at the target before the word list module reads it
+    if args.data_dir is not None:
+        os.environ["WORDLE_DATA_DIR"] = str(args.data_dir.resolve())
+
+    from feedback import FeedbackMatrix
+    from word_list import DATA_DIR, default_word_list_api, default_word_list_path
+
+    source = args.source or default_word_list_api(args.word_length)
+    if source is None:
+        parser.error(f"No known word list for {args.word_length} letter words, pass --source")
+
+    words = [word for word in read_words(source) if len(word) == args.word_length]
+    if not words:
+        parser.error(f"'{source}' holds no {args.word_length} letter words")
+    import_word_list(words, default_word_list_path(args.word_length), verbose=True)
+
+    answers = None
+    if args.answers is not None:
+        answers = [word for word in read_words(args.answers) if len(word) == args.word_length]
+        suffix = "" if args.word_length == 5 else f"_{args.word_length}"
+        import_word_list(answers, DATA_DIR / f"answers{suffix}.json", verbose=True)
+
+    if not args.no_feedback_matrix:
+        feedback_matrix = FeedbackMatrix.load_or_build(words, answers, cache_dir=DATA_DIR, workers=args.workers, verbose=True)
+        print(f"Feedback matrix ready at '{feedback_matrix.path}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import numpy as np
+
+ALPHABET_SIZE = 26
+
+
+class WordListEngine:
+    def __init__(self, word_list: list[str], letters: np.ndarray | None = None) -> None:
+
+        # Keep the original words around so indices can be mapped back to strings
+        self.words = word_list
+        self.index = {word: i for i, word in enumerate(self.words)}
+
+        # Encode all words once into a (N, word_length) letter matrix plus per-letter count/presence masks
+        self.letters = self.encode_words(self.words) if letters is None else letters
+        self.letter_counts = self._count_letters(self.letters)
+        self.letter_present = self.letter_counts > 0
+
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+
+    @staticmethod
+    def encode_words(word_list: list[str]) -> np.ndarray:
+        """Encodes a list of equal length lowercase words into a uint8 matrix of letter codes (a=0, ..., z=25)"""
+
+        if len(word_list) == 0:
+            return np.empty((0, 5), dtype=np.uint8)
+
+        word_length = len(word_list[0])
+        if any(len(word) != word_length for word in word_list):
+            raise ValueError("All words in the word list must have the same length")
+
+        try:
+            raw = np.frombuffer("".join(word_list).encode("ascii"), dtype=np.uint8)
+        except UnicodeEncodeError:
+            raise ValueError("The word list may only contain the letters a-z")
+
+        # Characters below 'a' wrap around, so everything outside a-z ends up >= ALPHABET_SIZE
+        letters = (raw - ord("a")).reshape(-1, word_length)
+        if (letters >= ALPHABET_SIZE).any():
+            raise ValueError("The word list may only contain the letters a-z")
+
+        return letters
+
+
+    @staticmethod
+    def _count_letters(letters: np.ndarray) -> np.ndarray:
+        """Counts the occurrences of each letter in each encoded word -> (N, 26)"""
+        counts = np.zeros((letters.shape[0], ALPHABET_SIZE), dtype=np.uint8)
+        rows = np.arange(letters.shape[0])
+        for pos in range(letters.shape[1]):
+            counts[rows, letters[:, pos]] += 1
+        return counts
+
+
+    @staticmethod
+    def _letter_code(letter: str) -> int | None:
+        code = ord(letter) - ord("a") if len(letter) == 1 else -1
+        return code if 0 <= code < ALPHABET_SIZE else None
+
+
+    def words_at(self, indices: np.ndarray) -> list[str]:
+        return [self.words[i] for i in indices]
+
+
+    def filter_mask(self, letter_dict: dict, candidates: np.ndarray | None = None) -> np.ndarray:
+        """Applies the green/yellow/gray constraints of a letter_dict and returns a boolean mask of the surviving words.
+        If candidates (an index array) is given, the mask is over those candidates only."""
+
+        if candidates is None:
+            letters, present = self.letters, self.letter_present
+        else:
+            letters, present = self.letters[candidates], self.letter_present[candidates]
+
+        mask = np.ones(letters.shape[0], dtype=bool)
+
+        for green_letter, letter_idx in letter_dict["green"]:
+            # Keep words containing the green letter at the correct idx
+            code = self._letter_code(green_letter)
+            if code is None:
+                mask[:] = False
+                break
+            mask &= letters[:, letter_idx] == code
+
+        for yellow_letter, letter_idx in letter_dict["yellow"]:
+            # Keep words containing the yellow letter, but not at the idx known to not be correct
+            code = self._letter_code(yellow_letter)
+            if code is None:
+                mask[:] = False
+                break
+            mask &= (letters[:, letter_idx] != code) & present[:, code]
+
+        # Gray letters only remove words if the letter was not confirmed green or yellow elsewhere (multiple of the same char)
+        confirmed_letters = {l for l, _ in letter_dict["green"] + letter_dict["yellow"]}
+        for gray_letter in set(letter_dict["gray"]) - confirmed_letters:
+            code = self._letter_code(gray_letter)
+            if code is not None:
+                mask &= ~present[:, code]
+
+        return mask
+
+
+    def filter_word_list(self, letter_dict: dict, candidates: np.ndarray | None = None) -> np.ndarray:
+        """Returns the indices of the words that satisfy the letter_dict"""
+        if candidates is None:
+            return np.flatnonzero(self.filter_mask(letter_dict))
+        return candidates[self.filter_mask(letter_dict, candidates)]
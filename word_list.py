@@ -0,0 +1,133 @@
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+from metrics import metrics
+from word_engine import ALPHABET_SIZE, WordListEngine
+
+# Directory holding the word lists and their caches, next to the code unless configured with WORDLE_DATA_DIR
+DATA_DIR = Path(os.environ.get("WORDLE_DATA_DIR") or Path(__file__).resolve().parent / "word_lists")
+
+# With WORDLE_OFFLINE=1 missing word lists are an error instead of being fetched, import them with word_data.py first
+OFFLINE = os.environ.get("WORDLE_OFFLINE", "0") == "1"
+
+DEFAULT_WORD_LENGTH = 5
+DEFAULT_WORD_LIST_PATH = DATA_DIR / "words.json"
+DEFAULT_WORD_LIST_API = "https://cheaderthecoder.github.io/5-Letter-words/words.json"
+
+
+def default_word_list_path(word_length: int = DEFAULT_WORD_LENGTH) -> Path:
+    """The json word list of a word length, other lengths than the default live next to it as words_<length>.json"""
+    if word_length == DEFAULT_WORD_LENGTH:
+        return DEFAULT_WORD_LIST_PATH
+    return DEFAULT_WORD_LIST_PATH.with_name(f"words_{word_length}.json")
+
+
+def default_word_list_api(word_length: int = DEFAULT_WORD_LENGTH) -> str | None:
+    """The api the word list of a word length is fetched from when missing, only known for the default length"""
+    return DEFAULT_WORD_LIST_API if word_length == DEFAULT_WORD_LENGTH else None
+
+
+class WordListStore:
+    """A word list held as a read-only (N, word_length) array of letter codes (a=0, ..., z=25), memory-mapped from its
+    binary file. The letter codes are shared by all processes, the decoded words are built per process on first use."""
+
+    def __init__(self, letters: np.ndarray) -> None:
+        self.letters = letters
+        self._words = None
+
+
+    def __len__(self) -> int:
+        return self.letters.shape[0]
+
+
+    @property
+    def word_length(self) -> int:
+        return self.letters.shape[1]
+
+
+    @property
+    def words(self) -> list[str]:
+        """The words as python strings, decoded once per process"""
+        if self._words is None:
+            raw = (self.letters + ord("a")).tobytes().decode("ascii")
+            self._words = [raw[i:i + self.word_length] for i in range(0, len(raw), self.word_length)]
+        return self._words
+
+
+    def word(self, idx: int) -> str:
+        """A single word, without decoding the whole list"""
+        if self._words is not None:
+            return self._words[idx]
+        return (self.letters[idx] + ord("a")).tobytes().decode("ascii")
+
+
+    def letter_codes(self) -> np.ndarray:
+        """The words encoded as letter codes (a=0, ..., z=25), the memory-mapped array itself"""
+        return self.letters
+
+
+
+def _read_json_word_list(word_list_path: Path, word_list_api: str | None) -> list[str]:
+    """Reads the json word list, fetching and saving it from the api first if it is missing"""
+
+    if word_list_path.exists():
+        with open(word_list_path, 'r') as file:
+            return json.load(file)["words"]
+    if word_list_api is None or OFFLINE:
+        raise FileNotFoundError(f"Word list '{word_list_path}' not found, import it with: python word_data.py")
+
+    # Only imported when a word list has to be fetched, so offline use never loads it
+    import requests
+
+    response = requests.get(word_list_api)
+    if response.status_code != 200:
+        raise ValueError("Failed to fetch word list")
+
+    print("Fetched word list from API")
+    word_list_json = response.json()
+    word_list_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(word_list_path, "w") as file:
+        json.dump(word_list_json, file, indent=4)
+    return word_list_json["words"]
+
+
+def convert_word_list(word_list: list[str], binary_path: Path) -> None:
+    """Writes a word list as the fixed width binary array file of letter codes"""
+
+    letters = WordListEngine.encode_words(word_list)
+
+    # Write to a temporary file first, so concurrently starting processes never map a partial file
+    tmp_path = binary_path.with_name(f"{binary_path.stem}.{os.getpid()}.tmp.npy")
+    np.save(tmp_path, letters)
+    os.replace(tmp_path, binary_path)
+
+
+# Stores loaded by this process, keyed by the resolved json path
+_stores: dict[Path, WordListStore] = {}
+
+
+@metrics.timed("word_list_load")
+def get_word_list(word_list_path: Path = DEFAULT_WORD_LIST_PATH, word_list_api: str | None = DEFAULT_WORD_LIST_API) -> WordListStore:
+    """Loads a word list once per process. The json list is converted into a binary file next to it on first use
+    (or when the json changed), which is then memory-mapped so all processes share the same pages."""
+
+    word_list_path = Path(word_list_path)
+    key = word_list_path.resolve()
+    if key in _stores:
+        return _stores[key]
+
+    binary_path = word_list_path.with_suffix(".npy")
+    if not binary_path.exists() or (word_list_path.exists() and word_list_path.stat().st_mtime > binary_path.stat().st_mtime):
+        convert_word_list(_read_json_word_list(word_list_path, word_list_api), binary_path)
+
+    # Files written by older versions hold ascii bytes instead of letter codes, those are converted again
+    letters = np.load(binary_path, mmap_mode="r")
+    if len(letters) and letters[0].max() >= ALPHABET_SIZE:
+        convert_word_list(_read_json_word_list(word_list_path, word_list_api), binary_path)
+        letters = np.load(binary_path, mmap_mode="r")
+
+    _stores[key] = WordListStore(letters)
+    return _stores[key]
@@ -1,18 +1,150 @@
-from fastapi import FastAPI, HTTPException
+import os
+import time
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
+from feedback import MAX_WORD_LENGTH, compute_feedback_codes
+from game_log import GameLogWriter
+from game_sessions import SessionStore, session_word_length
+from game_state import SQLiteBackend
+from metrics import metrics, profiler
+from solver_service import lifespan as solver_lifespan, router as solver_router
+from word_engine import WordListEngine
+from word_list import DEFAULT_WORD_LENGTH
 from wordle_game import WordleGame
 
-# Init api instance
-app = FastAPI()
+# Init api instance, also serving the next guess endpoints of the solver service (warming its solver at startup)
+app = FastAPI(lifespan=solver_lifespan)
+app.include_router(solver_router)
 
-# Init game object
-game = WordleGame()
+# Guesses per game, for every word length
+MAX_GUESSES = int(os.environ.get("WORDLE_MAX_GUESSES", "6"))
+
+# Game state is held per worker process, unless a SQLite database shared by all workers is given
+# (e.g. WORDLE_STATE_DB=/dev/shm/wordle.db to run uvicorn with --workers)
+STATE_DB = os.environ.get("WORDLE_STATE_DB")
+
+# Finished games are appended to binary logs in this directory if given, summarize them with: python game_log.py <dir>
+GAME_LOG_DIR = os.environ.get("WORDLE_GAME_LOG")
+
+def _state_backend(table: str, ttl: float = 3600.0) -> SQLiteBackend | None:
+    return None if STATE_DB is None else SQLiteBackend(STATE_DB, table=table, ttl=ttl)
+
+def _new_game(word_length: int, **kwargs) -> WordleGame:
+    # The global games never expire
+    game = WordleGame(word_length=word_length, max_guesses=MAX_GUESSES,
+                      state_backend=_state_backend(f"wordle_{word_length}", ttl=float("inf")), **kwargs)
+    if GAME_LOG_DIR is not None:
+        game.game_log = GameLogWriter(GAME_LOG_DIR, guess_words=game.word_store.words, answer_words=game.answer_store.words,
+                                      max_guesses=MAX_GUESSES)
+    return game
+
+def _new_sessions(game: WordleGame) -> SessionStore:
+    # Session games share the log of the global game of their word length
+    return SessionStore(word_list=game.answer_store.words, max_guesses=MAX_GUESSES,
+                        backend=_state_backend(f"sessions_{game.word_length}"), game_log=game.game_log,
+                        allowed_guesses=game.allowed_guesses, hard_mode=game.hard_mode)
+
+# Init game object, optionally drawing the secrets from a separate answer list and enforcing hard mode
+game = _new_game(
+    word_length=DEFAULT_WORD_LENGTH,
+    answer_list_path=os.environ.get("WORDLE_ANSWER_LIST"),
+    hard_mode=os.environ.get("WORDLE_HARD_MODE", "0") == "1",
+)
 #game = WordleGame(seed=42)
 
+# Init session scoped games, sharing one answer list
+sessions = _new_sessions(game)
+
+# Games and sessions per word length, the variants besides the default one are loaded on their first request
+games = {DEFAULT_WORD_LENGTH: game}
+session_stores = {DEFAULT_WORD_LENGTH: sessions}
+
+# Limits on the work done by a single batch request
+MAX_BATCH_SIZE = 10_000
+MAX_SCORE_BATCH_SIZE = 1_000_000
+
 # Create model for the guess message
 class WordleGuess(BaseModel):
     guess: str
 
+# Create models for the batch messages
+class WordleBatchCreate(BaseModel):
+    count: int
+
+class WordleBatchGuess(BaseModel):
+    session_ids: list[str]
+    guesses: list[str]
+
+class WordleBatchScore(BaseModel):
+    guesses: list[str]
+    secrets: list[str]
+
+
+class MetricsToggle(BaseModel):
+    enabled: bool
+
+class ProfilingToggle(BaseModel):
+    sample_rate: float
+
+
+def _check_format(format: str):
+    if format not in ("json", "binary"):
+        raise HTTPException(status_code=400, detail="Format must be 'json' or 'binary'")
+
+def _get_game(word_length: int) -> WordleGame:
+    if word_length not in games:
+        if not 0 < word_length <= MAX_WORD_LENGTH:
+            raise HTTPException(status_code=400, detail=f"Word length must be between 1 and {MAX_WORD_LENGTH}")
+        try:
+            games[word_length] = _new_game(word_length, hard_mode=game.hard_mode)
+        except (FileNotFoundError, ValueError):
+            raise HTTPException(status_code=404, detail=f"No word list for {word_length} letter words")
+    return games[word_length]
+
+def _get_sessions(word_length: int) -> SessionStore:
+    if word_length not in session_stores:
+        session_stores[word_length] = _new_sessions(_get_game(word_length))
+    return session_stores[word_length]
+
+def _find_sessions(session_id: str) -> SessionStore:
+    """The session store of the word length the session was created with, loading it if this worker has not yet"""
+    word_length = session_word_length(session_id)
+    if word_length is not None and 0 < word_length <= MAX_WORD_LENGTH:
+        try:
+            store = _get_sessions(word_length)
+        except HTTPException:
+            store = None
+        if store is not None and session_id in store:
+            return store
+    raise HTTPException(status_code=404, detail=f"Game session '{session_id}' not found")
+
+# Time every endpoint and profile a sample of the requests, passing straight through while both are off
+@app.middleware("http")
+async def instrument_requests(request: Request, call_next):
+
+    if not (metrics.enabled or profiler.enabled):
+        return await call_next(request)
+
+    profile = profiler.start() if profiler.should_profile() else None
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+    except BaseException:
+        if profile is not None:
+            profiler.stop(profile)
+        raise
+    seconds = time.perf_counter() - start
+
+    # Label by the route template, so session ids don't create a series each
+    route = request.scope.get("route")
+    endpoint = f"{request.method} {route.path if route is not None else 'unmatched'}"
+    metrics.observe("request", seconds, endpoint=endpoint)
+    metrics.inc("requests", endpoint=endpoint, status=response.status_code)
+    if profile is not None:
+        profiler.stop(profile, name=endpoint, seconds=seconds)
+    return response
+
 # Create root endpoint
 @app.get("/")
 async def root():
@@ -20,30 +152,138 @@ async def root():
 
 # Create guessing endpoint
 @app.post("/wordle")
-async def wordle(guess: WordleGuess):
-    
+async def wordle(guess: WordleGuess, word_length: int = DEFAULT_WORD_LENGTH):
+
     try:
-        game_response = game.make_guess(guess=guess.guess.lower())
+        game_response = _get_game(word_length).make_guess(guess=guess.guess.lower())
         return game_response
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 # Create status endpoint
 @app.get("/wordle")
-async def wordle_status():
-    return game.status()
+async def wordle_status(word_length: int = DEFAULT_WORD_LENGTH):
+    return _get_game(word_length).status()
 
 # Create restart endpoint
 @app.post("/wordle/restart")
-async def wordle_restart():
-    return game.restart_game()
+async def wordle_restart(word_length: int = DEFAULT_WORD_LENGTH):
+    return _get_game(word_length).restart_game()
+
+# Create batch scoring endpoint, feedback codes of every guess against every secret
+# (row-major uint8 if binary, little-endian uint16 for words longer than 5 letters)
+@app.post("/wordle/batch")
+async def wordle_batch(batch: WordleBatchScore, format: str = "json"):
+
+    _check_format(format)
+    if len(batch.guesses) * len(batch.secrets) > MAX_SCORE_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_SCORE_BATCH_SIZE} guess/secret pairs per batch")
+    try:
+        guess_letters = WordListEngine.encode_words([guess.lower() for guess in batch.guesses])
+        secret_letters = WordListEngine.encode_words([secret.lower() for secret in batch.secrets])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if guess_letters.shape[1] != secret_letters.shape[1]:
+        raise HTTPException(status_code=400, detail="Guesses and secrets must have the same length")
+    codes = compute_feedback_codes(guess_letters, secret_letters)
+
+    if format == "binary":
+        return Response(content=codes.tobytes(), media_type="application/octet-stream")
+    return {"codes": codes.tolist()}
+
+# Create batch session game endpoint
+@app.post("/games/batch")
+async def games_batch_create(batch: WordleBatchCreate, word_length: int = DEFAULT_WORD_LENGTH):
+
+    if not 0 < batch.count <= MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"Count must be between 1 and {MAX_BATCH_SIZE}")
+    return {"session_ids": _get_sessions(word_length).create_many(batch.count)}
+
+# Create batch session guessing endpoint, all sessions must have the given word length.
+# If binary, the feedback codes (as for /wordle/batch) followed by the guesses used per pair (uint8)
+@app.post("/games/batch/guess")
+async def games_batch_guess(batch: WordleBatchGuess, format: str = "json", word_length: int = DEFAULT_WORD_LENGTH):
+
+    _check_format(format)
+    if len(batch.session_ids) != len(batch.guesses):
+        raise HTTPException(status_code=400, detail="Expected one guess per session id")
+    if len(batch.guesses) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_SIZE} guesses per batch")
 
+    codes, guesses_used, errors = _get_sessions(word_length).make_guesses(
+        session_ids=batch.session_ids,
+        guesses=[guess.lower() for guess in batch.guesses],
+    )
 
+    if format == "binary":
+        return Response(content=codes.tobytes() + guesses_used.tobytes(), media_type="application/octet-stream")
+    return {"codes": codes.tolist(), "guesses_used": guesses_used.tolist(), "errors": errors}
 
+# Create session game endpoint
+@app.post("/games")
+async def games_create(word_length: int = DEFAULT_WORD_LENGTH):
+    session_id = _get_sessions(word_length).create()
+    return {"session_id": session_id, "guesses_used": 0}
 
-        
+# Create session guessing endpoint
+@app.post("/games/{session_id}/guess")
+async def games_guess(session_id: str, guess: WordleGuess):
 
+    try:
+        return _find_sessions(session_id).make_guess(session_id=session_id, guess=guess.guess.lower())
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Game session '{session_id}' not found")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# Create session status endpoint
+@app.get("/games/{session_id}")
+async def games_status(session_id: str):
+
+    try:
+        return _find_sessions(session_id).status(session_id=session_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Game session '{session_id}' not found")
+
+# Create session restart endpoint
+@app.post("/games/{session_id}/restart")
+async def games_restart(session_id: str):
+
+    try:
+        return _find_sessions(session_id).restart_game(session_id=session_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Game session '{session_id}' not found")
+
+# Create session end endpoint
+@app.delete("/games/{session_id}")
+async def games_delete(session_id: str):
+
+    try:
+        _find_sessions(session_id).delete(session_id=session_id)
+        return {"message": "Game session ended."}
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Game session '{session_id}' not found")
 
+# Create metrics endpoint, in the Prometheus text format
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_export():
+    return metrics.render_prometheus()
 
+# Create metrics toggle endpoint
+@app.post("/debug/metrics")
+async def metrics_toggle(toggle: MetricsToggle):
+    metrics.enabled = toggle.enabled
+    return {"enabled": metrics.enabled}
 
+# Create profiling toggle endpoint, profiling the given fraction of requests
+@app.post("/debug/profiling")
+async def profiling_toggle(toggle: ProfilingToggle):
+    if not 0 <= toggle.sample_rate <= 1:
+        raise HTTPException(status_code=400, detail="Sample rate must be between 0 and 1")
+    profiler.sample_rate = toggle.sample_rate
+    return {"sample_rate": profiler.sample_rate}
 
+# Create profiling results endpoint, the stats of the most recently profiled requests
+@app.get("/debug/profiling")
+async def profiling_results():
+    return {"sample_rate": profiler.sample_rate, "profiles": list(profiler.results)}
@@ -1,83 +1,151 @@
+import time
 import numpy as np
-import requests
-import os
+from contextlib import contextmanager
 from pathlib import Path
-import json
+from constraints import ConstraintState
+from feedback import score_guess
+from game_log import GameLogWriter
+from game_state import GameSession, MemoryBackend, SQLiteBackend
+from word_list import default_word_list_api, default_word_list_path, get_word_list
 
 class WordleGame:
-    def __init__(self, seed: int | None = None) -> None:
+    def __init__(self,
+                 seed: int | None = None,
+                 answer_list_path: str | Path | None = None,
+                 hard_mode: bool = False,
+                 word_length: int = 5,
+                 max_guesses: int = 6,
+                 state_backend: MemoryBackend | SQLiteBackend | None = None,
+                 state_key: str = "wordle",
+                 game_log: GameLogWriter | None = None,
+                 ) -> None:
         self.random_gen = np.random.default_rng(seed=seed)
-        self.word_list_path = Path("word_lists/words.json")
-        self.word_list_api = "https://cheaderthecoder.github.io/5-Letter-words/words.json"
+        self.word_length = word_length
+        self.max_guesses = max_guesses
+        self.word_list_path = default_word_list_path(word_length)
+        self.word_list_api = default_word_list_api(word_length)
+        self.word_store = get_word_list(self.word_list_path, self.word_list_api)
+        if self.word_store.word_length != word_length:
+            raise ValueError(f"The word list '{self.word_list_path}' does not hold {word_length} letter words")
+        self.hard_mode = hard_mode
+        
+        # Secrets come from the answer list if given, guesses must then be part of the (allowed guess) word list
+        self.answer_store = self.word_store
+        self.allowed_guesses = None
+        if answer_list_path is not None:
+            self.answer_store = get_word_list(answer_list_path, word_list_api=None)
+            self.allowed_guesses = set(self.word_store.words)
+        
         self.secret_word = self._generate_word()
         self.guesses = []
+        self.constraints = ConstraintState(word_length=self.word_store.word_length)
         
-    
-    def _generate_word(self):
+        # Optionally keep the game in a state backend (under state_key), so several server workers play the same game
+        self.state_backend = state_backend
+        self.state_key = state_key
         
-        if self.word_list_path.exists():
-            with open(self.word_list_path, 'r') as file:
-                word_list = json.load(file)["words"]
+        # Optionally record every finished game
+        self.game_log = game_log
         
-        else:
-            response = requests.get(self.word_list_api)
-            if response.status_code == 200:
-                print("Fetched word list from API")
-                word_list_json = response.json()
-                
-                with open(self.word_list_path, "w") as file:
-                    json.dump(word_list_json, file, indent=4)
-                word_list = word_list_json["words"]
-            else:
-                raise ValueError("Failed to fetch word list")
+    
+    def _generate_word(self):
+        self.started = time.time()
+        self.secret_idx = int(self.random_gen.integers(low=0, high=len(self.answer_store)))
+        return self.answer_store.word(self.secret_idx)
+    
+    
+    @contextmanager
+    def _shared_state(self):
+        """Loads the game from the state backend for the enclosed changes and saves it afterwards, all in one transaction"""
+        if self.state_backend is None:
+            yield
+            return
         
-        return word_list[self.random_gen.integers(low=0, high=len(word_list))]
+        with self.state_backend.transaction():
+            try:
+                state = self.state_backend.get(self.state_key)
+                self.secret_idx, self.guesses, self.started = state.secret_idx, state.guesses, state.started
+                self.secret_word = self.answer_store.word(self.secret_idx)
+            except KeyError:
+                pass # First use, the game of this process becomes the shared one
+            
+            # Replay the guesses into the hard mode constraints
+            self.constraints = ConstraintState(word_length=self.word_store.word_length)
+            if self.hard_mode:
+                for guess in self.guesses:
+                    self.constraints.merge(word=guess, feedback=self.compute_feedback(guess=guess, secret_word=self.secret_word))
+            
+            yield
+            self.state_backend.put(self.state_key, GameSession(self.secret_idx, self.guesses, started=self.started))
     
     
     def restart_game(self):
+        with self._shared_state():
+            return self._restart()
+    
+    
+    def _restart(self, finished: bool = False):
+        """Starts a new game, recording the current one in the game log if it finished (solved or out of guesses)"""
         response = {
             "message": "Game restarted.",
             "secret_word": self.secret_word,
             "guesses": self.guesses,
         }
+        if finished and self.game_log is not None:
+            self.game_log.log(secret_idx=self.secret_idx, guesses=self.guesses, started=self.started)
         self.secret_word = self._generate_word()
         self.guesses = []
+        self.constraints = ConstraintState(word_length=self.word_store.word_length)
         return response
     
     
+    @staticmethod
+    def compute_feedback(guess: str, secret_word: str) -> str:
+        """Feedback for a guess against the secret word, e.g. '00120' for gray, gray, yellow, green, gray"""
+        return score_guess(guess=guess, secret_word=secret_word)
+    
+    
     def make_guess(self, guess: str):
-        if len(guess) != 5:
-            raise ValueError("Guess must be exactly 5 letters!")
+        with self._shared_state():
+            return self._make_guess(guess)
+    
+    
+    def _make_guess(self, guess: str):
+        if len(guess) != self.word_length or not (guess.isascii() and guess.isalpha() and guess.islower()):
+            raise ValueError(f"Guess must be exactly {self.word_length} letters!")
+        if self.allowed_guesses is not None and guess not in self.allowed_guesses:
+            raise ValueError("Not in word list!")
+        
+        # In hard mode every revealed hint must be used in the following guesses
+        if self.hard_mode:
+            violation = self.constraints.hard_mode_violation(guess)
+            if violation is not None:
+                raise ValueError(f"Hard mode: {violation}!")
         
         # Save guess
         self.guesses.append(guess)
         
         # Compute feedback
-        feedback = []
-        for guess_letter, secret_letter in zip(guess, self.secret_word):
-            if guess_letter == secret_letter:
-                feedback.append("2")
-            elif guess_letter in self.secret_word:
-                feedback.append("1")
-            else:
-                feedback.append("0")
+        feedback = self.compute_feedback(guess=guess, secret_word=self.secret_word)
+        if self.hard_mode:
+            self.constraints.merge(word=guess, feedback=feedback)
         
         # Return response
         response = {
             "guess": guess,
-            "feedback": "".join(feedback),
+            "feedback": feedback,
             "guesses_used": len(self.guesses),
             "is_correct": guess == self.secret_word,
-            "out_of_guesses": len(self.guesses) >= 6,
+            "out_of_guesses": len(self.guesses) >= self.max_guesses,
             "game_summary": None,
         }
         
         if response["is_correct"]: # Check if guess is correct
-            response["game_summary"] = self.restart_game()
+            response["game_summary"] = self._restart(finished=True)
             return response
             
         elif response["out_of_guesses"]: # Check if player has run out of guesses
-            response["game_summary"] = self.restart_game()
+            response["game_summary"] = self._restart(finished=True)
             return response
             
         else: # Return response if game is not over
@@ -85,8 +153,9 @@ class WordleGame:
     
     
     def status(self):
-        return {
-            "guesses": self.guesses,
-            "guesses_used": len(self.guesses),
-            "secret_word": self.secret_word,
-        }
\ No newline at end of file
+        with self._shared_state():
+            return {
+                "guesses": self.guesses,
+                "guesses_used": len(self.guesses),
+                "secret_word": self.secret_word,
+            }
\ No newline at end of file